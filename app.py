@@ -1,7 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any
 import datetime
+import hashlib
+import json
+import os
 import shutil
+import tempfile
 
 from pathlib import Path
 
@@ -12,7 +17,8 @@ import pandas as pd
 import hopsworks
 import streamlit as st
 from ruamel.yaml import YAML
-import time
+
+from backend import forecast_bundle
 
 
 APP_DIR = Path(__file__).resolve().parent
@@ -23,12 +29,14 @@ static_dir.mkdir(exist_ok=True)
 
 download_path = APP_DIR / "backend" / "air_quality_models" / "general" / "downloads"
 download_path.mkdir(parents=True, exist_ok=True)
+bundle_dir = static_dir / "bundle"
 
 # Map constants
 STOCKHOLM_CENTER = (59.3293, 18.0686)
 MAP_ZOOM = 11
 SENSORS_FILE = Path(__file__).resolve().parent / "backend" / "sensors" / "sensors.yml"
 CACHE_TTL_S = 12 * 60 * 60
+MAX_DOWNLOAD_WORKERS = 8
 
 BOTTOM_IMAGE_URL = "https://raw.githubusercontent.com/ltumat/AirQualityPrediction/refs/heads/main/docs/team_image/dunking.jpeg"
 YOUTUBE_URL = "https://www.youtube.com/watch?v=lIsTm0lGzY4&list=RDlIsTm0lGzY4&start_radio=1"
@@ -44,39 +52,51 @@ def load_sensors(file_path: Path) -> dict[str, Any]:
         return yaml_parser.load(fp)
 
 
-@st.cache_data(ttl=CACHE_TTL_S)
-def get_data():
+def _sensor_coordinates() -> pd.DataFrame:
     sensors_doc = load_sensors(SENSORS_FILE)
-    yestarday = datetime.datetime.now() - datetime.timedelta(1)
     sensors: list[dict[str, Any]] = sensors_doc.get("sensors", [])
-    new_sensors: list[dict[str, Any]] = []
-
-    project = hopsworks.login(api_key_value=st.secrets["HOPSWORKS_API_KEY"] ,engine="python")
-    fs = project.get_feature_store()
-    
-    time.sleep(1)
-
-    dataset_api = project.get_dataset_api()
-    str_yestarday = yestarday.strftime("%Y_%m_%d")
-    for sensor in sensors:
-        street_new = sensor['street'].replace('-', '_')
-        street_new = street_new.replace('ä', 'ae')
-        street_new = street_new.replace('ö', 'oe')
-        street_new = street_new.replace('å', 'oa')
-
-        local_name = f"pm25_forecast_{street_new}_{str_yestarday}.png"
-        local_file = download_path / local_name
-
-        dataset_api.download(
-            "Resources/airquality/general" + f"/pm25_forecast_{street_new}_{str_yestarday}.png", 
-            str(download_path), 
-            overwrite=True,
-        )
-        shutil.copy(local_file, static_dir / local_name)
-
-        sensor["img_pred"] = f"{PAGE_NAME}/static/{local_name}"
-        new_sensors.append(sensor)
-
+    return pd.DataFrame(sensors)[["street", "latitude", "longitude"]]
+
+
+def _street_slug(street: str) -> str:
+    street_new = street.replace('-', '_')
+    street_new = street_new.replace('ä', 'ae')
+    street_new = street_new.replace('ö', 'oe')
+    street_new = street_new.replace('å', 'oa')
+    return street_new
+
+
+def download_forecast_images(dataset_api, sensors: list[dict[str, Any]], str_date: str) -> dict[str, Path]:
+    """
+    Makes the dated forecast image of every sensor available in `download_path` and returns them
+    by street. Images already downloaded for that date are reused, the missing ones are fetched
+    concurrently on a bounded pool.
+    """
+    local_files = {
+        sensor["street"]: download_path / f"pm25_forecast_{_street_slug(sensor['street'])}_{str_date}.png"
+        for sensor in sensors
+    }
+    missing = [local_file for local_file in local_files.values() if not local_file.exists()]
+
+    def _fetch(local_file: Path) -> None:
+        # Download into a private directory first so a failed fetch never leaves a partial image
+        # behind that the next run would take for a complete one
+        with tempfile.TemporaryDirectory(dir=download_path) as tmp_dir:
+            dataset_api.download(f"{forecast_bundle.REMOTE_DIR}/{local_file.name}", tmp_dir, overwrite=True)
+            os.replace(Path(tmp_dir) / local_file.name, local_file)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(missing))) as executor:
+            list(executor.map(_fetch, missing))
+    return local_files
+
+
+def read_latest_predictions(fs, since: datetime.datetime) -> pd.DataFrame:
+    """
+    Latest next-day prediction per sensor from the monitor feature group. The date bound is pushed
+    down to the feature store, so the read stays the same size however long the history gets. If
+    nothing was predicted since then, the whole history is read once and the newest rows are kept.
+    """
     monitor_fg = fs.get_or_create_feature_group(
         name=f'aq_predictions_general',
         description='Air Quality prediction monitoring',
@@ -84,12 +104,71 @@ def get_data():
         primary_key=['city','street','date','days_before_forecast_day'],
         event_time="date"
     )
-    monitor_df = monitor_fg.filter(monitor_fg.days_before_forecast_day == 1).read()
+    since = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    monitor_df = monitor_fg.filter(
+        (monitor_fg.days_before_forecast_day == 1) & (monitor_fg.date >= since)
+    ).read()
+    if monitor_df.empty:
+        # Inference has not run for a while: show the last known predictions rather than an empty map
+        monitor_df = monitor_fg.filter(monitor_fg.days_before_forecast_day == 1).read()
+    # A run from yesterday and one from today can both be in the window, keep the newest per sensor
+    monitor_df = monitor_df.sort_values("date").drop_duplicates(subset=["street"], keep="last")
+    return monitor_df.reset_index(drop=True)
+
+
+def _get_data_from_images(project) -> pd.DataFrame:
+    """Builds the map data from the monitor feature group and the per-sensor images, for when no bundle exists yet."""
+    sensors_doc = load_sensors(SENSORS_FILE)
+    yestarday = datetime.datetime.now() - datetime.timedelta(1)
+    sensors: list[dict[str, Any]] = sensors_doc.get("sensors", [])
+
+    dataset_api = project.get_dataset_api()
+    local_files = download_forecast_images(dataset_api, sensors, yestarday.strftime("%Y_%m_%d"))
+    for sensor in sensors:
+        local_file = local_files[sensor["street"]]
+        if not (static_dir / local_file.name).exists():
+            shutil.copy(local_file, static_dir / local_file.name)
+        sensor["img_pred"] = f"{PAGE_NAME}/static/{local_file.name}"
+
+    monitor_df = read_latest_predictions(project.get_feature_store(), yestarday)
 
     sensor_df = pd.DataFrame(sensors)
     sensor_df = sensor_df[["street", "latitude", "longitude", "img_pred"]]
-    
-    monitor_df = monitor_df.merge(sensor_df, on="street", how="left")
+    return monitor_df.merge(sensor_df, on="street", how="left")
+
+
+@st.cache_data(ttl=CACHE_TTL_S)
+def get_data():
+    # The inference pipeline publishes one bundle with the latest predictions and forecast images,
+    # so a cache miss is a single download instead of a feature group read plus one file per sensor
+    project = None
+    try:
+        project = hopsworks.login(api_key_value=st.secrets["HOPSWORKS_API_KEY"], engine="python")
+        dataset_api = project.get_dataset_api()
+        bundle_file = dataset_api.download(
+            f"{forecast_bundle.REMOTE_DIR}/{forecast_bundle.LATEST_NAME}",
+            str(download_path),
+            overwrite=True,
+        )
+        manifest = forecast_bundle.extract_bundle(bundle_file, bundle_dir)
+    except Exception as e:
+        # Keep serving the last bundle that was extracted successfully
+        manifest = forecast_bundle.load_manifest(bundle_dir)
+        if manifest is None:
+            if project is None:
+                raise
+            print(f"No forecast bundle available ({e}), loading the single forecast images")
+            return _get_data_from_images(project)
+        print(f"Could not fetch the forecast bundle, using the one from {manifest['version']}: {e}")
+
+    monitor_df = pd.DataFrame(manifest["sensors"])
+    monitor_df["img_pred"] = f"{PAGE_NAME}/static/{bundle_dir.name}/" + monitor_df["image"].fillna("")
+
+    # Fill in coordinates the inference side did not know about
+    coordinates = _sensor_coordinates()
+    monitor_df = monitor_df.merge(coordinates, on="street", how="left", suffixes=("", "_sensors"))
+    for column in ["latitude", "longitude"]:
+        monitor_df[column] = monitor_df[column].fillna(monitor_df.pop(f"{column}_sensors"))
     return monitor_df
 
 
@@ -138,8 +217,21 @@ def build_sensors(df: pd.DataFrame) -> list[Sensor]:
     return sensors
 
 
-def draw_map(sensors: list[Sensor]) -> None:
-    """Build a Folium map with hover tooltips and clickable popups."""
+def snapshot_key(sensors: list[Sensor]) -> str:
+    """Hash of what the map shows, so the rendered HTML is only rebuilt when the predictions change."""
+    payload = [
+        (sensor.name, float(sensor.lat), float(sensor.lon), float(sensor.pm25), sensor.image_url)
+        for sensor in sensors
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+@st.cache_data(max_entries=8)
+def render_map_html(snapshot: str, _sensors: list[Sensor]) -> str:
+    """Build a Folium map with hover tooltips and clickable popups and return its HTML.
+
+    Cached on `snapshot` only (the underscore keeps Streamlit from hashing the sensors themselves).
+    """
     base_map = folium.Map(
         location=STOCKHOLM_CENTER,
         zoom_start=MAP_ZOOM,
@@ -229,7 +321,11 @@ def draw_map(sensors: list[Sensor]) -> None:
     # (optional) layer control to toggle heatmap on/off
     folium.LayerControl().add_to(base_map)
 
-    st.components.v1.html(base_map._repr_html_(), height=800)
+    return base_map._repr_html_()
+
+
+def draw_map(sensors: list[Sensor]) -> None:
+    st.components.v1.html(render_map_html(snapshot_key(sensors), sensors), height=800)
 
 
 def main() -> None:
@@ -0,0 +1 @@
+"""Air quality prediction: data collection, features, training, inference and the app helpers."""
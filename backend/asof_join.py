@@ -0,0 +1,120 @@
+"""
+Point-in-time correct joins of the air quality and weather features, done locally.
+
+`asof_join` gives every left row the latest right row with the same keys whose event time is at
+or before the left row's, optionally no older than `tolerance`. Both sides are stacked and sorted
+once by (key, time), and the last right row seen so far is carried forward with a running
+maximum, so the join is a few vectorized numpy passes for all sensors together and the result
+does not depend on the input row order.
+
+`training_matrix` uses it to build the rows of every sensor for one lag feature, with the same
+columns the `air_quality_fv_<lag>` feature view returns with primary_key=True.
+"""
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.util.features import SENSOR_KEYS, WEATHER_FEATURES
+
+
+def _times(values: pd.Series) -> np.ndarray:
+    # to_datetime on a column that already is datetime still scans it, so only convert when needed
+    times = values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values)
+    if getattr(times.dt, "tz", None) is not None:
+        times = times.dt.tz_convert(None)
+    return times.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def asof_join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_on: Sequence[str],
+    right_on: Optional[Sequence[str]] = None,
+    left_time: str = "date",
+    right_time: str = "date",
+    tolerance: Optional[pd.Timedelta] = None,
+    suffix: str = "_right",
+) -> pd.DataFrame:
+    """
+    Left join of `right` onto `left` on the key columns, matching each left row with the newest
+    right row at or before its time. Rows without a match (or only an older one than `tolerance`)
+    get NaN. Keeps the rows and row order of `left`; right columns that clash get `suffix`.
+    """
+    left_on = list(left_on)
+    right_on = list(right_on) if right_on is not None else left_on
+    n_left, n_right = len(left), len(right)
+
+    # One code per key combination, shared by both sides
+    keys = pd.concat(
+        [right[right_on].set_axis(left_on, axis=1), left[left_on]], ignore_index=True
+    )
+    key = keys.groupby(left_on, sort=False, dropna=False).ngroup().to_numpy()
+    time = np.concatenate([_times(right[right_time]), _times(left[left_time])])
+    is_left = np.r_[np.zeros(n_right, dtype=np.int8), np.ones(n_left, dtype=np.int8)]
+
+    # Right rows sort before left rows of the same key and time, so exact matches are taken
+    order = np.lexsort((is_left, time, key))
+    sorted_right = is_left[order] == 0
+    last = np.maximum.accumulate(np.where(sorted_right, np.arange(len(order)), -1))
+
+    left_at = np.flatnonzero(~sorted_right)
+    source = last[left_at]
+    matched = source >= 0
+    matched[matched] = key[order[source[matched]]] == key[order[left_at[matched]]]
+    if tolerance is not None:
+        age = time[order[left_at]] - time[order[np.maximum(source, 0)]]
+        matched &= age <= pd.Timedelta(tolerance).value
+
+    match = np.full(n_left, -1)
+    match[order[left_at] - n_right] = np.where(matched, order[np.maximum(source, 0)], -1)
+
+    values = right.drop(columns=[c for c in right_on if c in left_on] + ([right_time] if right_time in left.columns else []))
+    values = values.rename(columns={c: f"{c}{suffix}" for c in values.columns if c in left.columns})
+    # Label -1 does not exist, so rows without a match come back as NaN like in a pandas left merge
+    joined = values.reset_index(drop=True).reindex(match)
+    joined.index = left.index
+    return pd.concat([left, joined], axis=1)
+
+
+def training_matrix(
+    air_quality: pd.DataFrame,
+    weather: pd.DataFrame,
+    lag_feature: str,
+    air_quality_fg: str = "air_quality_with_all_lags",
+    weather_fg: str = "weather",
+    tolerance: Optional[pd.Timedelta] = None,
+) -> pd.DataFrame:
+    """
+    Rows of all sensors joined with their city's weather at the same day, ordered by sensor and
+    date. Columns follow the feature view: pm25, the lag feature (unless it is pm25 itself), date,
+    the weather features, then the primary keys named '<feature group>_1_<key>'.
+    """
+    aq_features = ['pm25', 'date'] if lag_feature == 'pm25' else ['pm25', lag_feature, 'date']
+    aq = air_quality[SENSOR_KEYS + [c for c in aq_features if c != 'date'] + ['date']].copy()
+    aq['date'] = _times(aq['date']).view("datetime64[ns]")
+    aq = aq.sort_values(SENSOR_KEYS + ['date'], kind="stable").reset_index(drop=True)
+
+    city_weather = weather[['city', 'date'] + WEATHER_FEATURES]
+    joined = asof_join(aq, city_weather, ['city'], tolerance=tolerance)
+
+    for column in SENSOR_KEYS:
+        joined[f"{air_quality_fg}_1_{column}"] = joined[column]
+    joined[f"{weather_fg}_1_city"] = joined['city']
+    columns = aq_features + WEATHER_FEATURES + [f"{air_quality_fg}_1_{c}" for c in SENSOR_KEYS] + [f"{weather_fg}_1_city"]
+    return joined[columns]
+
+
+def split_by_date(df: pd.DataFrame, test_start, labels: Sequence[str] = ("pm25",)):
+    """X_train, X_test, y_train, y_test with rows before / from `test_start`, like train_test_split."""
+    labels = list(labels)
+    test = (df['date'] >= pd.Timestamp(test_start)).to_numpy()
+    X, y = df.drop(columns=labels), df[labels]
+    return (
+        X[~test].reset_index(drop=True),
+        X[test].reset_index(drop=True),
+        y[~test].reset_index(drop=True),
+        y[test].reset_index(drop=True),
+    )
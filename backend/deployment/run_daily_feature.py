@@ -10,6 +10,8 @@ image = (
     modal.Image.debian_slim(python_version="3.12.11")
     .pip_install_from_requirements(requirements_txt="requirements.txt")
     .add_local_dir("backend/deployment", remote_path="/root/general")
+    # The same backend package the notebooks and pipelines import locally
+    .add_local_python_source("backend")
 )
 
 if Path(".env").exists():
@@ -9,8 +9,13 @@ app = modal.App("daily-inference")
 image = (
     modal.Image.debian_slim(python_version="3.12.11")
     .pip_install_from_requirements(requirements_txt="requirements.txt")
+    # Registry downloads are cached on a volume, unchanged models are not fetched again every day
+    .env({"AQ_MODEL_CACHE": "/root/model_cache"})
     .add_local_dir("backend/deployment", remote_path="/root/general")
+    # The same backend package the notebooks and pipelines import locally
+    .add_local_python_source("backend")
 )
+model_cache_volume = modal.Volume.from_name("aq-model-cache", create_if_missing=True)
 
 if Path(".env").exists():
     from dotenv import dotenv_values
@@ -22,6 +27,7 @@ else:
     image=image,
     schedule=modal.Period(days=1),
     secrets=[modal.Secret.from_dict(env_vars)],
+    volumes={"/root/model_cache": model_cache_volume},
     timeout=800,
 )
 def run_inference():
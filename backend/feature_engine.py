@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+import yaml
+
+
+LAGS_FILE = Path(__file__).resolve().parent / "models" / "lags.yml"
+SENSOR_KEYS = ["country", "city", "street"]
+
+# Columns of the air_quality_with_all_lags feature group, always written by the backfill
+DEFAULT_FEATURES = ["pm25_rolling_3d", "pm25_rolling_2d", "pm25_lag_1", "pm25_lag_2", "pm25_lag_3"]
+
+_FEATURE_PATTERN = re.compile(r"^(?P<source>\w+?)_(?P<kind>lag|rolling|ewm)_(?P<window>\d+)d?$")
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    One derived feature of a sensor's daily series, always built from strictly earlier days:
+    `lag` is the value `window` days back, `rolling` the mean of the previous `window` values
+    (at least one) and `ewm` the exponentially weighted mean with span `window` up to yesterday.
+    """
+
+    kind: str
+    window: int
+    source: str = "pm25"
+
+    @property
+    def name(self) -> str:
+        if self.kind == "lag":
+            return f"{self.source}_lag_{self.window}"
+        return f"{self.source}_{self.kind}_{self.window}d"
+
+    @classmethod
+    def parse(cls, feature_name: str) -> "FeatureSpec":
+        """pm25_lag_1 -> lag 1, pm25_rolling_3d -> rolling 3, pm25_ewm_7d -> ewm span 7."""
+        match = _FEATURE_PATTERN.match(feature_name)
+        if match is None:
+            raise ValueError(f"Unsupported feature: {feature_name}")
+        return cls(kind=match["kind"], window=int(match["window"]), source=match["source"])
+
+
+def feature_specs(feature_names: Iterable[str]) -> List[FeatureSpec]:
+    """Specs for the derived features in `feature_names`, skipping raw columns such as pm25 and duplicates."""
+    specs = []
+    for feature_name in feature_names:
+        if not _FEATURE_PATTERN.match(feature_name):
+            continue
+        spec = FeatureSpec.parse(feature_name)
+        if spec not in specs:
+            specs.append(spec)
+    return specs
+
+
+def load_feature_specs(file_path: Path = LAGS_FILE, include_defaults: bool = True) -> List[FeatureSpec]:
+    """The feature group's default features plus every derived feature listed in lags.yml."""
+    with open(file_path, "r") as f:
+        configured = [lag["feature"] for lag in yaml.safe_load(f)["lags"]]
+    return feature_specs((DEFAULT_FEATURES if include_defaults else []) + configured)
+
+
+def _segment_starts(sensor: np.ndarray) -> np.ndarray:
+    """Offset of the first row of every row's sensor, for sensor codes already sorted."""
+    n = len(sensor)
+    new_segment = np.ones(n, dtype=bool)
+    new_segment[1:] = sensor[1:] != sensor[:-1]
+    starts = np.flatnonzero(new_segment)
+    return np.repeat(starts, np.diff(np.append(starts, n)))
+
+
+def _lag(x: np.ndarray, position: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    valid = position >= window
+    out[valid] = x[np.flatnonzero(valid) - window]
+    return out
+
+
+def _rolling_mean(x: np.ndarray, position: np.ndarray, window: int) -> np.ndarray:
+    # Summing the shifted columns directly keeps the result identical to pandas' rolling mean for
+    # the short windows used here, where a cumulative sum would drift by a few ulps over years
+    total = np.zeros(len(x))
+    count = np.zeros(len(x))
+    for offset in range(1, window + 1):
+        shifted = _lag(x, position, offset)
+        observed = ~np.isnan(shifted)
+        total[observed] += shifted[observed]
+        count += observed
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def _ewm_mean(x: np.ndarray, start: np.ndarray, position: np.ndarray, span: int) -> np.ndarray:
+    if len(x) == 0:
+        return np.zeros(0)
+    # All sensors advance one day per step, so the loop runs over the longest history, not the rows
+    decay = 1.0 - 2.0 / (span + 1.0)
+    starts = np.unique(start)
+    lengths = np.diff(np.append(starts, len(x)))
+    grid = np.full((len(starts), lengths.max()), np.nan)
+    segment = np.searchsorted(starts, start)
+    grid[segment, position] = x
+
+    # Same recursion as pandas' ewm(span, adjust=True).mean(); missing days still decay the weight
+    weighted = grid[:, 0].copy()
+    old_weight = np.ones(len(starts))
+    means = np.full_like(grid, np.nan)
+    means[:, 0] = weighted
+    for step in range(1, grid.shape[1]):
+        current = grid[:, step]
+        observed = ~np.isnan(current)
+        started = ~np.isnan(weighted)
+        old_weight = np.where(started, old_weight * decay, old_weight)
+        update = started & observed & (weighted != current)
+        weighted = np.where(update, (old_weight * weighted + current) / (old_weight + 1.0), weighted)
+        old_weight = np.where(started & observed, old_weight + 1.0, old_weight)
+        weighted = np.where(~started & observed, current, weighted)
+        means[:, step] = weighted
+
+    # Shift by one day so a row only sees the mean up to yesterday
+    out = np.full(len(x), np.nan)
+    later = position >= 1
+    out[later] = means[segment[later], position[later] - 1]
+    return out
+
+
+def add_lag_features(
+    df: pd.DataFrame,
+    specs: Sequence[FeatureSpec] | None = None,
+    group_cols: Sequence[str] = SENSOR_KEYS,
+    date_col: str = "date",
+) -> pd.DataFrame:
+    """
+    Returns a copy of `df` with one float32 column per spec, computed for all sensors at once.
+
+    Rows are sorted by sensor and date a single time; segment starts mark where a sensor's series
+    begins, so lags and windows never cross sensors and no per-group Python callbacks are needed.
+    The result keeps the row order of `df`. Earliest rows get NaN where a lag has no history yet.
+    """
+    specs = feature_specs(DEFAULT_FEATURES) if specs is None else list(specs)
+    group_cols = list(group_cols)
+    out = df.copy()
+    if not specs:
+        return out
+
+    sensor = out.groupby(group_cols, sort=False).ngroup().to_numpy()
+    order = np.lexsort([out[date_col].to_numpy(), sensor])
+    start = _segment_starts(sensor[order])
+    position = np.arange(len(order)) - start
+
+    sources = {}
+    for spec in specs:
+        if spec.source not in sources:
+            sources[spec.source] = out[spec.source].to_numpy(dtype=np.float64)[order]
+        x = sources[spec.source]
+        if spec.kind == "lag":
+            values = _lag(x, position, spec.window)
+        elif spec.kind == "rolling":
+            values = _rolling_mean(x, position, spec.window)
+        else:
+            values = _ewm_mean(x, start, position, spec.window)
+
+        column = np.empty(len(order), dtype=np.float32)
+        column[order] = values
+        out[spec.name] = column
+    return out
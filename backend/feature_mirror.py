@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+from urllib.parse import quote
+
+import pandas as pd
+
+
+MIRROR_DIR = Path(__file__).resolve().parent / "data" / "mirror"
+STATE_FILE = "_state.json"
+
+
+class FeatureGroupMirror:
+    """
+    Local read-through copy of a Hopsworks feature group, stored as Hive-partitioned Parquet.
+
+    Rows are partitioned by `partition_cols` plus the month of the event time, one file per
+    partition. `sync()` only pulls rows newer than the last synced event time (minus
+    `lookback_days`, for groups such as weather whose recent rows are rewritten by forecasts) and
+    rewrites just the partitions those rows fall into. It also records the feature group's latest
+    commit and row count, so rows inserted with older event times are noticed and re-pulled. `read()` scans the local files with
+    partition pruning and Parquet predicate pushdown instead of reading the whole group remotely.
+    """
+
+    def __init__(
+        self,
+        feature_group: Any,
+        partition_cols: Sequence[str],
+        primary_key: Optional[Sequence[str]] = None,
+        event_time: str = "date",
+        lookback_days: int = 0,
+        root: Path = MIRROR_DIR,
+    ):
+        self.feature_group = feature_group
+        self.partition_cols = list(partition_cols)
+        self.primary_key = list(primary_key or feature_group.primary_key)
+        self.event_time = event_time
+        self.lookback_days = lookback_days
+        self.path = Path(root) / f"{feature_group.name}_{feature_group.version}"
+
+    # -- state ---------------------------------------------------------------
+
+    def _state(self) -> Optional[dict]:
+        state_path = self.path / STATE_FILE
+        if not state_path.exists():
+            return None
+        with state_path.open("r", encoding="utf-8") as fp:
+            return json.load(fp)
+
+    def _save_state(self, high_water_mark: pd.Timestamp, remote: Optional[dict]) -> None:
+        state = {"high_water_mark": high_water_mark.isoformat(), "local_rows": self.row_count()}
+        if remote is not None:
+            state.update(commit=remote["commit"], rows=remote["rows"])
+        self.path.mkdir(parents=True, exist_ok=True)
+        with (self.path / STATE_FILE).open("w", encoding="utf-8") as fp:
+            json.dump(state, fp)
+
+    def high_water_mark(self) -> Optional[pd.Timestamp]:
+        state = self._state()
+        return None if state is None else pd.Timestamp(state["high_water_mark"])
+
+    def data_version(self) -> Optional[dict]:
+        """What the mirror was last synced to: the high-water mark, its row count and the feature group commit, if known."""
+        state = self._state()
+        if state is None:
+            return None
+        return {key: state.get(key) for key in ("high_water_mark", "local_rows", "commit")}
+
+    def row_count(self) -> int:
+        import pyarrow.dataset as ds
+
+        if not self.path.exists():
+            return 0
+        # State and temporary files start with '_' or '.', which the dataset skips
+        return ds.dataset(self.path, format="parquet", partitioning="hive").count_rows()
+
+    def _remote_version(self) -> Optional[dict]:
+        """Newest commit id and row count of the feature group from its commit log, None if it has none."""
+        try:
+            details = self.feature_group.commit_details()
+        except Exception:
+            return None
+        if not details:
+            return None
+        rows = sum(int(d.get("rowsInserted", 0)) - int(d.get("rowsDeleted", 0)) for d in details.values())
+        return {"commit": str(max(details, key=int)), "rows": rows}
+
+    def reset(self) -> None:
+        """Drop the local copy; the next sync pulls the full feature group again."""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    # -- sync ----------------------------------------------------------------
+
+    def _partition_dir(self, values: Sequence[Any]) -> Path:
+        path = self.path
+        for column, value in zip(self.partition_cols + ["month"], values):
+            path = path / f"{column}={quote(str(value), safe='')}"
+        return path
+
+    def _write(self, rows: pd.DataFrame) -> None:
+        rows[self.event_time] = pd.to_datetime(rows[self.event_time]).dt.tz_localize(None)
+        rows["month"] = rows[self.event_time].dt.strftime("%Y-%m")
+
+        for values, part in rows.groupby(self.partition_cols + ["month"], sort=False):
+            values = values if isinstance(values, tuple) else (values,)
+            part_dir = self._partition_dir(values)
+            part_file = part_dir / "part-0.parquet"
+            part = part.drop(columns=self.partition_cols + ["month"])
+            if part_file.exists():
+                # Newly pulled rows win over the mirrored ones with the same key
+                existing = pd.read_parquet(part_file)
+                part = pd.concat([existing, part], ignore_index=True)
+                keys = [c for c in self.primary_key + [self.event_time] if c in part.columns]
+                part = part.drop_duplicates(subset=keys, keep="last")
+            part_dir.mkdir(parents=True, exist_ok=True)
+            part = part.sort_values(self.event_time)
+            # Dot-files are skipped by the Parquet dataset reader, so a crash never leaves a half file visible
+            tmp_file = part_dir / ".part-0.parquet.tmp"
+            part.to_parquet(tmp_file, index=False)
+            tmp_file.replace(part_file)
+
+    def sync(self, resync: Optional[Sequence[Any]] = None) -> int:
+        """
+        Pulls rows newer than the high-water mark into the mirror. Returns the number of rows pulled.
+
+        Rows inserted later with older event times (a backfill of a new sensor, repaired history)
+        are not newer than the high-water mark. Pass the values of the first partition column they
+        were inserted for as `resync` to pull those partitions again. Otherwise the feature group's
+        commit log catches them: when its row count changed by more than the mirror's, the mirror
+        is rebuilt from a full read.
+        """
+        fg = self.feature_group
+        state = self._state()
+        remote = self._remote_version()
+        if state is not None and not resync and remote is not None and state.get("commit") == remote["commit"]:
+            # Nothing was committed since the last sync
+            return 0
+
+        hwm = None if state is None else pd.Timestamp(state["high_water_mark"])
+        if hwm is None:
+            new_rows = fg.read()
+        else:
+            since = hwm - pd.Timedelta(days=self.lookback_days)
+            if self.lookback_days:
+                new_rows = fg.filter(fg.get_feature(self.event_time) >= since).read()
+            else:
+                new_rows = fg.filter(fg.get_feature(self.event_time) > since).read()
+        pulled = len(new_rows)
+        if pulled:
+            self._write(new_rows)
+            new_hwm = new_rows[self.event_time].max()
+            hwm = new_hwm if hwm is None else max(hwm, new_hwm)
+
+        if resync and state is not None:
+            column = self.partition_cols[0]
+            for value in resync:
+                shutil.rmtree(self.path / f"{column}={quote(str(value), safe='')}", ignore_errors=True)
+            resynced = fg.filter(fg.get_feature(column).isin(list(resync))).read()
+            if len(resynced):
+                self._write(resynced)
+                hwm = max(hwm, resynced[self.event_time].max())
+            pulled += len(resynced)
+        elif state is not None and remote is not None and state.get("rows") is not None:
+            expected = state["local_rows"] + remote["rows"] - state["rows"]
+            if self.row_count() != expected:
+                print(f"Mirror of {fg.name} is missing rows inserted with older dates, pulling it again")
+                self.reset()
+                return self.sync()
+
+        if hwm is None:
+            return 0
+        self._save_state(hwm, remote)
+        if pulled:
+            print(f"Synced {pulled} rows of {fg.name} into {self.path}")
+        return pulled
+
+    # -- read ----------------------------------------------------------------
+
+    def read(
+        self,
+        filters: Optional[List[tuple]] = None,
+        columns: Optional[List[str]] = None,
+        since: Any = None,
+    ) -> pd.DataFrame:
+        """
+        Reads the mirror. `filters` are pyarrow (column, op, value) tuples and are pushed down to
+        the partition directories and Parquet row groups. `since` keeps rows with event time >= since
+        and also prunes whole month partitions.
+        """
+        filters = list(filters or [])
+        if since is not None:
+            since = pd.Timestamp(since).tz_localize(None)
+            filters += [("month", ">=", since.strftime("%Y-%m")), (self.event_time, ">=", since)]
+        if not (self.path / STATE_FILE).exists():
+            raise FileNotFoundError(f"No mirror at {self.path}, call sync() first")
+
+        df = pd.read_parquet(
+            self.path,
+            engine="pyarrow",
+            filters=filters or None,
+            columns=columns,
+            partitioning="hive",
+        )
+        # Partition values come back as categoricals of strings
+        for column in self.partition_cols + ["month"]:
+            if column in df.columns:
+                df[column] = df[column].astype(str)
+        return df.drop(columns=["month"], errors="ignore")
+
+    def sync_and_read(self, **kwargs) -> pd.DataFrame:
+        self.sync()
+        return self.read(**kwargs)
+
+
+def air_quality_mirror(air_quality_fg: Any, root: Path = MIRROR_DIR) -> FeatureGroupMirror:
+    return FeatureGroupMirror(
+        air_quality_fg,
+        partition_cols=["street"],
+        primary_key=["country", "city", "street"],
+        root=root,
+    )
+
+
+def weather_mirror(weather_fg: Any, root: Path = MIRROR_DIR) -> FeatureGroupMirror:
+    # Forecast rows for the coming days are re-inserted daily, so re-pull them on every sync
+    return FeatureGroupMirror(
+        weather_fg,
+        partition_cols=["city"],
+        primary_key=["city"],
+        lookback_days=10,
+        root=root,
+    )
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import datetime
+import json
+import shutil
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+
+REMOTE_DIR = "Resources/airquality/general"
+LATEST_NAME = "forecast_bundle_latest.zip"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_COLUMNS = ["date", "country", "city", "street", "predicted_pm25", "days_before_forecast_day"]
+
+
+def build_bundle(
+    predictions: pd.DataFrame,
+    sensors: List[Dict[str, Any]],
+    image_files: Dict[str, str],
+    out_dir: str,
+    version: str,
+) -> Path:
+    """
+    Packs the latest forecast of every sensor into one zip: a manifest with the predictions for the
+    next day plus the sensor coordinates, and the forecast images keyed by street.
+    Returns the path of `forecast_bundle_{version}.zip` in `out_dir`.
+    """
+    latest = predictions[predictions["days_before_forecast_day"] == 1][MANIFEST_COLUMNS].copy()
+    latest["date"] = pd.to_datetime(latest["date"]).dt.strftime("%Y-%m-%d")
+    latest["predicted_pm25"] = latest["predicted_pm25"].astype(float)
+    latest["days_before_forecast_day"] = latest["days_before_forecast_day"].astype(int)
+    by_street = {row["street"]: row for row in latest.to_dict("records")}
+
+    entries = []
+    for sensor in sensors:
+        row = by_street.get(sensor["street"])
+        if row is None:
+            continue
+        image_file = image_files.get(sensor["street"])
+        # Older sensor files have no coordinates; the app then takes them from its own sensors.yml
+        row.update({
+            "latitude": sensor.get("latitude"),
+            "longitude": sensor.get("longitude"),
+            "image": None if image_file is None else Path(image_file).name,
+        })
+        entries.append(row)
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "sensors": entries,
+    }
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    bundle_path = out_dir / f"forecast_bundle_{version}.zip"
+    # Images are already compressed PNGs, storing them is as small and much faster
+    with zipfile.ZipFile(bundle_path, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr(MANIFEST_FILE, json.dumps(manifest, indent=2, ensure_ascii=False))
+        for image_file in image_files.values():
+            zf.write(image_file, arcname=Path(image_file).name)
+    return bundle_path
+
+
+def publish_bundle(dataset_api: Any, bundle_path: Path, remote_dir: str = REMOTE_DIR) -> None:
+    """Uploads the dated bundle and a copy under the fixed name the app downloads."""
+    bundle_path = Path(bundle_path)
+    latest_path = bundle_path.with_name(LATEST_NAME)
+    shutil.copyfile(bundle_path, latest_path)
+    if not dataset_api.exists(remote_dir):
+        dataset_api.mkdir(remote_dir)
+    dataset_api.upload(str(bundle_path), remote_dir, overwrite=True)
+    dataset_api.upload(str(latest_path), remote_dir, overwrite=True)
+
+
+def extract_bundle(bundle_path: str, target_dir: Path) -> Dict[str, Any]:
+    """
+    Unpacks a bundle into `target_dir` and returns its manifest. The bundle is checked and unpacked
+    next to the target first, so a broken download never replaces the last good bundle.
+    """
+    target_dir = Path(target_dir)
+    staging_dir = target_dir.with_name(f".{target_dir.name}.new")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    with zipfile.ZipFile(bundle_path) as zf:
+        manifest = json.loads(zf.read(MANIFEST_FILE))
+        missing = [s["image"] for s in manifest["sensors"] if s["image"] and s["image"] not in zf.namelist()]
+        if missing:
+            raise ValueError(f"Bundle {bundle_path} is missing images: {missing}")
+        zf.extractall(staging_dir)
+
+    old_dir = target_dir.with_name(f".{target_dir.name}.old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if target_dir.exists():
+        target_dir.replace(old_dir)
+    staging_dir.replace(target_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def load_manifest(target_dir: Path) -> Optional[Dict[str, Any]]:
+    """Manifest of the bundle last extracted into `target_dir`, or None if there is none."""
+    try:
+        with (Path(target_dir) / MANIFEST_FILE).open("r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,82 @@
+"""
+Import-time budget for the light helper modules.
+
+Every module is imported in a fresh interpreter (best of a few runs), and the check fails when a
+module takes longer than its budget or pulls in one of the heavy client libraries at import time.
+
+    python -m backend.import_budget            # from the repository root
+    python -m backend.import_budget --repeat 5
+"""
+import argparse
+import subprocess
+import sys
+
+# Seconds per module, measured cold. numpy and pandas alone take most of it, and every
+# backend.util submodule goes through the package __init__ first.
+BUDGETS = {
+    "backend.util": 1.0,
+    "backend.util.features": 1.0,
+    "backend.util.ingest": 1.0,
+    "backend.util.inference": 1.0,
+    "backend.util.plotting": 1.0,
+    "backend.util.admin": 1.0,
+    "backend.lag_state": 1.0,
+    "backend.feature_engine": 1.0,
+    "backend.model_store": 1.0,
+    "backend.local_store": 1.0,
+    "backend.asof_join": 1.0,
+    "backend.split_cache": 1.0,
+}
+HEAVY_MODULES = [
+    "hopsworks",
+    "hsfs",
+    "xgboost",
+    "matplotlib",
+    "geopy",
+    "openmeteo_requests",
+    "requests_cache",
+]
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def measure(module: str, repeat: int = 3) -> tuple[float, list[str]]:
+    """Best import time of `module` over `repeat` fresh interpreters, and the heavy modules it loaded."""
+    best, heavy = float("inf"), []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed, _, loaded = result.stdout.strip().partition(" ")
+        best = min(best, float(elapsed))
+        heavy = [m for m in loaded.split(",") if m]
+    return best, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS.items():
+        elapsed, heavy = measure(module, args.repeat)
+        ok = elapsed <= budget and not heavy
+        failed |= not ok
+        note = f" loads {', '.join(heavy)}" if heavy else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<28} {elapsed:6.3f}s / {budget:.1f}s{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend import feature_engine
+from backend.util.features import feature_history_length
+
+SENSOR_KEYS = feature_engine.SENSOR_KEYS
+# Where the daily job keeps the state in the Hopsworks dataset API
+REMOTE_DIR = "Resources/airquality"
+STATE_FILE = "lag_state.json"
+
+SensorKey = Tuple[str, str, str]
+
+
+def configured_features() -> List[str]:
+    """Derived columns of the air_quality_with_all_lags feature group, as the backfill builds them from lags.yml."""
+    return [spec.name for spec in feature_engine.load_feature_specs()]
+
+
+class LagStateStore:
+    """
+    Recent pm25 values of every sensor, enough to emit the derived features of the next day.
+
+    Each sensor owns one row of an (N sensors x capacity) float32 ring buffer plus the date of its last
+    observation, so adding a day is O(1) and building today's lag row never needs the history.
+    Exponentially weighted means cannot be rebuilt from a window, so their running mean and weight
+    are kept per sensor and span instead. The state is a small JSON file that the daily job loads,
+    updates and saves.
+    """
+
+    def __init__(self, capacity: int = 3, ewm_spans: Sequence[int] = ()):
+        self.capacity = capacity
+        self.ewm_spans = sorted(set(ewm_spans))
+        self.index: Dict[SensorKey, int] = {}
+        self.values = np.full((0, capacity), np.nan, dtype=np.float32)
+        self.head = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.last_date: List[Optional[pd.Timestamp]] = []
+        # Same recursion as feature_engine's ewm: the mean so far and the weight of the old values
+        self.ewm_mean = np.full((0, len(self.ewm_spans)), np.nan, dtype=np.float32)
+        self.ewm_weight = np.ones((0, len(self.ewm_spans)), dtype=np.float32)
+
+    @classmethod
+    def for_features(cls, feature_names: Optional[Sequence[str]] = None) -> "LagStateStore":
+        specs = feature_engine.feature_specs(configured_features() if feature_names is None else feature_names)
+        if any(spec.source != "pm25" for spec in specs):
+            raise ValueError("The state only keeps pm25 values")
+        windows = [feature_history_length(spec.name) for spec in specs if spec.kind != "ewm"]
+        return cls(capacity=max(windows, default=1), ewm_spans=[spec.window for spec in specs if spec.kind == "ewm"])
+
+    def covers(self, feature_names: Optional[Sequence[str]] = None) -> bool:
+        """Whether the state can emit all of the features, e.g. after lags.yml gained a new one."""
+        for spec in feature_engine.feature_specs(configured_features() if feature_names is None else feature_names):
+            if spec.kind == "ewm" and spec.window not in self.ewm_spans:
+                return False
+            if spec.kind != "ewm" and feature_history_length(spec.name) > self.capacity:
+                return False
+        return True
+
+    def _row(self, key: SensorKey) -> int:
+        if key not in self.index:
+            self.index[key] = len(self.index)
+            self.values = np.vstack([self.values, np.full((1, self.capacity), np.nan, dtype=np.float32)])
+            self.head = np.append(self.head, 0)
+            self.count = np.append(self.count, 0)
+            self.last_date.append(None)
+            self.ewm_mean = np.vstack([self.ewm_mean, np.full((1, len(self.ewm_spans)), np.nan, dtype=np.float32)])
+            self.ewm_weight = np.vstack([self.ewm_weight, np.ones((1, len(self.ewm_spans)), dtype=np.float32)])
+        return self.index[key]
+
+    def last_observed(self, key: SensorKey) -> Optional[pd.Timestamp]:
+        row = self.index.get(key)
+        return None if row is None else self.last_date[row]
+
+    def _update_ewm(self, row: int, pm25: float) -> None:
+        for j, span in enumerate(self.ewm_spans):
+            decay = 1.0 - 2.0 / (span + 1.0)
+            mean, weight = float(self.ewm_mean[row, j]), float(self.ewm_weight[row, j])
+            if np.isnan(mean):
+                self.ewm_mean[row, j] = pm25
+                continue
+            weight *= decay
+            if not np.isnan(pm25):
+                if mean != pm25:
+                    mean = (weight * mean + pm25) / (weight + 1.0)
+                weight += 1.0
+            self.ewm_mean[row, j], self.ewm_weight[row, j] = mean, weight
+
+    def update(self, key: SensorKey, pm25: float, date: Any) -> bool:
+        """Adds one observation. Dates at or before the last observed one are ignored; returns whether it was added."""
+        row = self._row(key)
+        date = pd.Timestamp(date).tz_localize(None).normalize()
+        if self.last_date[row] is not None and date <= self.last_date[row]:
+            return False
+        self.values[row, self.head[row]] = pm25
+        self.head[row] = (self.head[row] + 1) % self.capacity
+        self.count[row] = min(self.count[row] + 1, self.capacity)
+        self.last_date[row] = date
+        self._update_ewm(row, float(pm25))
+        return True
+
+    def recent(self, key: SensorKey, n: int) -> np.ndarray:
+        """The last n observations of the sensor, newest first."""
+        if n > self.capacity:
+            raise ValueError(f"State only keeps {self.capacity} values, {n} requested")
+        row = self.index[key]
+        if self.count[row] < n:
+            raise ValueError(f"Only {self.count[row]} observations for {key}, {n} needed")
+        slots = (self.head[row] - 1 - np.arange(n)) % self.capacity
+        return self.values[row, slots]
+
+    def features(self, key: SensorKey, feature_names: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """The derived features for the day after the sensor's last observation, by default all configured ones."""
+        if feature_names is None:
+            feature_names = configured_features()
+        row = self.index[key]
+        new_features: Dict[str, Any] = {}
+        for spec in feature_engine.feature_specs(feature_names):
+            if spec.kind == "ewm":
+                if spec.window not in self.ewm_spans:
+                    raise ValueError(f"State has no running mean for {spec.name}, rebuild it from the history")
+                new_features[spec.name] = np.float32(self.ewm_mean[row, self.ewm_spans.index(spec.window)])
+                continue
+            window = self.recent(key, feature_history_length(spec.name))
+            if spec.kind == "lag":
+                new_features[spec.name] = np.float32(window[-1])
+            else:
+                new_features[spec.name] = np.float32(window.astype(np.float64).mean())
+        new_features.update(dict(zip(SENSOR_KEYS, key)))
+        return new_features
+
+    def missing(self, keys: Sequence[SensorKey]) -> List[SensorKey]:
+        """Sensors of `keys` without any observation in the state, e.g. backfilled after it was built."""
+        return [key for key in keys if self.last_observed(key) is None]
+
+    def seed(self, aq_data: pd.DataFrame) -> "LagStateStore":
+        """Replaces the state of every sensor in `aq_data` with one built from that history."""
+        aq_data = aq_data[SENSOR_KEYS + ["date", "pm25"]].copy()
+        aq_data["date"] = pd.to_datetime(aq_data["date"]).dt.tz_localize(None)
+        aq_data = aq_data.sort_values("date")
+        if not self.ewm_spans:
+            # Without running means only the last window of each sensor matters
+            aq_data = aq_data.groupby(SENSOR_KEYS, sort=False).tail(self.capacity)
+        for key in aq_data[SENSOR_KEYS].drop_duplicates().itertuples(index=False, name=None):
+            row = self._row(key)
+            self.values[row] = np.nan
+            self.head[row] = self.count[row] = 0
+            self.last_date[row] = None
+            self.ewm_mean[row] = np.nan
+            self.ewm_weight[row] = 1.0
+        for country, city, street, date, pm25 in aq_data.itertuples(index=False):
+            self.update((country, city, street), pm25, date)
+        return self
+
+    @classmethod
+    def from_history(cls, aq_data: pd.DataFrame, feature_names: Optional[Sequence[str]] = None) -> "LagStateStore":
+        """Builds the state from a full air quality history; only needed the first time."""
+        return cls.for_features(feature_names).seed(aq_data)
+
+    # -- persistence ---------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        sensors = []
+        for key, row in self.index.items():
+            # Store oldest first so loading does not depend on where the ring head was
+            count = int(self.count[row])
+            values = self.recent(key, count)[::-1].tolist() if count else []
+            last_date = self.last_date[row]
+            sensors.append({
+                "key": list(key),
+                "values": values,
+                "last_date": None if last_date is None else last_date.strftime("%Y-%m-%d"),
+                "ewm": {
+                    str(span): [None if np.isnan(self.ewm_mean[row, j]) else float(self.ewm_mean[row, j]), float(self.ewm_weight[row, j])]
+                    for j, span in enumerate(self.ewm_spans)
+                },
+            })
+        return {"capacity": self.capacity, "ewm_spans": self.ewm_spans, "sensors": sensors}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "LagStateStore":
+        state = cls(capacity=payload["capacity"], ewm_spans=payload.get("ewm_spans", ()))
+        for sensor in payload["sensors"]:
+            key = tuple(sensor["key"])
+            row = state._row(key)
+            values = sensor["values"]
+            state.values[row, :len(values)] = values
+            state.head[row] = len(values) % state.capacity
+            state.count[row] = len(values)
+            state.last_date[row] = None if sensor["last_date"] is None else pd.Timestamp(sensor["last_date"])
+            for j, span in enumerate(state.ewm_spans):
+                mean, weight = sensor.get("ewm", {}).get(str(span), [None, 1.0])
+                state.ewm_mean[row, j] = np.nan if mean is None else mean
+                state.ewm_weight[row, j] = weight
+        return state
+
+    def save(self, file_path: Path) -> None:
+        file_path = Path(file_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_path.open("w", encoding="utf-8") as fp:
+            json.dump(self.to_dict(), fp, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, file_path: Path) -> "LagStateStore":
+        with Path(file_path).open("r", encoding="utf-8") as fp:
+            return cls.from_dict(json.load(fp))
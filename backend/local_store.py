@@ -0,0 +1,663 @@
+"""
+Offline stand-in for the parts of Hopsworks the pipelines use.
+
+`LocalProject` hands out a feature store, model registry and dataset API that keep everything
+under one local directory, so the backfill -> train -> predict loop runs (and can be profiled)
+without a Hopsworks cluster. Only the subset of the hsfs API used in this repository exists:
+
+- feature groups: `insert` (upsert on primary key + event time), `read`, `filter`, `select`,
+  `select_all`, `select_features`, `get_feature`, `fg.<feature>` comparisons, descriptions,
+  `commit_details`
+- queries: `join` (as-of on the event time, like Hopsworks), `filter`, `read`
+- feature views: `train_test_split(test_start=...)`, `get_batch_data`
+- model registry: `python.create_model(...).save(dir)`, `get_model(...).download()`
+- dataset API: `exists`, `mkdir`, `upload`, `download`
+
+Feature group data is stored as Parquet, one file per insert, and compacted into a single file
+once `COMPACT_AFTER` inserts have piled up. It is selected with
+`FEATURE_STORE_BACKEND=local` in the settings (see `backend.models.config`).
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import operator
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from backend import asof_join
+
+LOCAL_STORE_DIR = Path(__file__).resolve().parent / "data" / "local_store"
+METADATA_FILE = "_metadata.json"
+COMMITS_FILE = "_commits.json"
+COMPACT_AFTER = 8
+
+_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def _comparable(column: pd.Series, value: Any) -> Any:
+    """Datetime literals in the column's timezone, so naive and UTC event times compare."""
+    if not pd.api.types.is_datetime64_any_dtype(column) or isinstance(value, (list, tuple, set)):
+        return value
+    value = pd.Timestamp(value)
+    tz = getattr(column.dt, "tz", None)
+    if tz is not None and value.tzinfo is None:
+        return value.tz_localize(tz)
+    if tz is None and value.tzinfo is not None:
+        return value.tz_convert(None)
+    return value
+
+
+class Filter:
+    """A condition on feature values; `&` and `|` combine them like hsfs filters."""
+
+    def __init__(self, op: str, left: Any, right: Any):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __and__(self, other: "Filter") -> "Filter":
+        return Filter("and", self, other)
+
+    def __or__(self, other: "Filter") -> "Filter":
+        return Filter("or", self, other)
+
+    def mask(self, df: pd.DataFrame) -> pd.Series:
+        if self.op == "and":
+            return self.left.mask(df) & self.right.mask(df)
+        if self.op == "or":
+            return self.left.mask(df) | self.right.mask(df)
+        column = df[self.left]
+        if self.op == "in":
+            return column.isin(self.right)
+        return _OPS[self.op](column, _comparable(column, self.right))
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.op in ("and", "or"):
+            return {"op": self.op, "left": self.left.to_dict(), "right": self.right.to_dict()}
+        value = self.right.isoformat() if isinstance(self.right, (datetime.date, pd.Timestamp)) else self.right
+        return {"op": self.op, "feature": self.left, "value": value}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Filter":
+        if data["op"] in ("and", "or"):
+            return cls(data["op"], cls.from_dict(data["left"]), cls.from_dict(data["right"]))
+        return cls(data["op"], data["feature"], data["value"])
+
+
+class Feature:
+    """A feature of a local feature group, compared to values to build filters."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __eq__(self, other: Any) -> Filter:  # type: ignore[override]
+        return Filter("==", self.name, other)
+
+    def __ne__(self, other: Any) -> Filter:  # type: ignore[override]
+        return Filter("!=", self.name, other)
+
+    def __gt__(self, other: Any) -> Filter:
+        return Filter(">", self.name, other)
+
+    def __ge__(self, other: Any) -> Filter:
+        return Filter(">=", self.name, other)
+
+    def __lt__(self, other: Any) -> Filter:
+        return Filter("<", self.name, other)
+
+    def __le__(self, other: Any) -> Filter:
+        return Filter("<=", self.name, other)
+
+    def isin(self, values: Sequence[Any]) -> Filter:
+        return Filter("in", self.name, list(values))
+
+    __hash__ = object.__hash__
+
+
+class LocalFeatureGroup:
+    """A feature group stored as Parquet files under `<root>/<name>_<version>/`."""
+
+    def __init__(self, store: "LocalFeatureStore", name: str, version: int, metadata: Dict[str, Any]):
+        self._store = store
+        self.name = name
+        self.version = version
+        self.primary_key: List[str] = list(metadata.get("primary_key", []))
+        self.event_time: Optional[str] = metadata.get("event_time")
+        self.description: str = metadata.get("description", "")
+        self._descriptions: Dict[str, str] = dict(metadata.get("features", {}))
+        self.path = store.root / f"{name}_{version}"
+
+    def __getattr__(self, name: str) -> Feature:
+        # fg.days_before_forecast_day == 0, as in hsfs
+        if name.startswith("_") or name not in self.columns:
+            raise AttributeError(name)
+        return Feature(name)
+
+    def __repr__(self) -> str:
+        return f"LocalFeatureGroup({self.name!r}, {self.version})"
+
+    # -- metadata ------------------------------------------------------------
+
+    def _save_metadata(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            "primary_key": self.primary_key,
+            "event_time": self.event_time,
+            "description": self.description,
+            "features": self._descriptions,
+        }
+        with (self.path / METADATA_FILE).open("w", encoding="utf-8") as fp:
+            json.dump(metadata, fp, indent=2)
+
+    def _parts(self) -> List[Path]:
+        return sorted(self.path.glob("part-*.parquet"))
+
+    @property
+    def columns(self) -> List[str]:
+        parts = self._parts()
+        if not parts:
+            return list(self._descriptions)
+        import pyarrow.parquet as pq
+
+        return list(pq.read_schema(parts[-1]).names)
+
+    @property
+    def features(self) -> List[Feature]:
+        return [Feature(name) for name in self.columns]
+
+    def get_feature(self, name: str) -> Feature:
+        return Feature(name)
+
+    def key_column(self, name: str) -> str:
+        """Name of a primary key column in training data read with primary_key=True."""
+        return f"{self._store.project_name}_{self.name}_{self.version}_{name}"
+
+    def update_feature_description(self, feature_name: str, description: str) -> "LocalFeatureGroup":
+        self._descriptions[feature_name] = description
+        self._save_metadata()
+        return self
+
+    # -- write ---------------------------------------------------------------
+
+    def _keys(self, df: pd.DataFrame) -> List[str]:
+        return [c for c in self.primary_key + ([self.event_time] if self.event_time else []) if c in df.columns]
+
+    def insert(self, features: pd.DataFrame, wait: bool = False, write_options: Optional[dict] = None, **kwargs):
+        """Upserts rows: a later insert replaces rows with the same primary key and event time."""
+        parts = self._parts()
+        number = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        for column in features.columns:
+            self._descriptions.setdefault(column, "")
+        self._save_metadata()
+
+        inserted, updated = self._count_new_keys(features)
+        tmp_file = self.path / f".part-{number:06d}.parquet.tmp"
+        features.reset_index(drop=True).to_parquet(tmp_file, index=False)
+        tmp_file.replace(self.path / f"part-{number:06d}.parquet")
+        self._log_commit(inserted, updated)
+        if len(parts) + 1 > COMPACT_AFTER:
+            self.compact()
+        return None, None
+
+    def _count_new_keys(self, features: pd.DataFrame):
+        """Rows of an insert that add a new key and rows that replace an existing one."""
+        keys = self._keys(features)
+        if not keys:
+            return len(features), 0
+        new_keys = pd.MultiIndex.from_frame(features[keys].drop_duplicates())
+        parts = self._parts()
+        if not parts:
+            return len(new_keys), 0
+        existing = pd.concat([pd.read_parquet(part, columns=keys) for part in parts], ignore_index=True)
+        updated = int(new_keys.isin(pd.MultiIndex.from_frame(existing)).sum())
+        return len(new_keys) - updated, updated
+
+    def _commits(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with (self.path / COMMITS_FILE).open("r", encoding="utf-8") as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return {}
+
+    def _log_commit(self, inserted: int, updated: int) -> None:
+        commits = self._commits()
+        commit_id = max([int(c) for c in commits] + [int(datetime.datetime.now().timestamp() * 1000) - 1]) + 1
+        commits[str(commit_id)] = {
+            "committedOn": datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
+            "rowsInserted": inserted,
+            "rowsUpdated": updated,
+            "rowsDeleted": 0,
+        }
+        with (self.path / COMMITS_FILE).open("w", encoding="utf-8") as fp:
+            json.dump(commits, fp, indent=2)
+
+    def commit_details(self, wrapper: Any = None, limit: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Commit id -> rows inserted, updated and deleted, newest first, like hsfs."""
+        commits = sorted(self._commits().items(), key=lambda item: -int(item[0]))
+        return dict(commits[:limit] if limit else commits)
+
+    def compact(self) -> None:
+        """Rewrites all inserts as one deduplicated file."""
+        parts = self._parts()
+        if len(parts) <= 1:
+            return
+        df = self.read()
+        tmp_file = self.path / f".part-{int(parts[-1].stem.split('-')[1]):06d}.parquet.tmp"
+        df.to_parquet(tmp_file, index=False)
+        for part in parts:
+            part.unlink()
+        tmp_file.replace(parts[-1])
+
+    def delete(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._store._forget(self.name, self.version)
+
+    # -- read ----------------------------------------------------------------
+
+    def read(self, *args, **kwargs) -> pd.DataFrame:
+        parts = self._parts()
+        if not parts:
+            return pd.DataFrame(columns=list(self._descriptions))
+        df = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+        keys = self._keys(df)
+        if len(parts) > 1 and keys:
+            df = df.drop_duplicates(subset=keys, keep="last").reset_index(drop=True)
+        return df
+
+    def select(self, features: Sequence[Any]) -> "Query":
+        names = [f.name if isinstance(f, Feature) else f for f in features]
+        return Query(self, names)
+
+    def select_all(self) -> "Query":
+        return Query(self, self.columns)
+
+    def select_features(self) -> "Query":
+        """Every feature except the primary key and event time, as in hsfs."""
+        skip = set(self._keys(pd.DataFrame(columns=self.columns)))
+        return Query(self, [c for c in self.columns if c not in skip])
+
+    def filter(self, condition: Filter) -> "Query":
+        return self.select_all().filter(condition)
+
+
+class Query:
+    """Selected features of a feature group, as-of joined with other feature groups and filtered."""
+
+    def __init__(self, feature_group: LocalFeatureGroup, features: List[str]):
+        self.feature_group = feature_group
+        self.features = list(features)
+        self.joins: List[Dict[str, Any]] = []
+        self.filters: List[Filter] = []
+
+    def join(self, query: "Query", on: Optional[Sequence[str]] = None, prefix: Optional[str] = None, **kwargs) -> "Query":
+        on = list(on) if on is not None else [c for c in self.feature_group.primary_key if c in query.feature_group.primary_key]
+        self.joins.append({"query": query, "on": on, "prefix": prefix})
+        return self
+
+    def filter(self, condition: Filter) -> "Query":
+        self.filters.append(condition)
+        return self
+
+    def _frame(self, query: "Query", extra: Sequence[str]) -> pd.DataFrame:
+        fg = query.feature_group
+        df = fg.read()
+        for condition in query.filters:
+            df = df[condition.mask(df)]
+        wanted = list(dict.fromkeys(query.features + [c for c in extra if c in df.columns]))
+        return df[wanted]
+
+    def read(self, primary_key: bool = False, event_time: bool = False, **kwargs) -> pd.DataFrame:
+        left_fg = self.feature_group
+        left_time = left_fg.event_time
+        join_keys = [key for join in self.joins for key in join["on"]]
+        left_extra = join_keys + ([left_time] if left_time else []) + (left_fg.primary_key if primary_key else [])
+        result = self._frame(self, left_extra)
+
+        keep = list(self.features)
+        # Hopsworks serves the primary keys as '<project>_<feature group>_<version>_<key>'
+        keys = {c: left_fg.key_column(c) for c in left_fg.primary_key} if primary_key else {}
+        for join in self.joins:
+            right_fg = join["query"].feature_group
+            right_time = right_fg.event_time
+            right_extra = join["on"] + ([right_time] if right_time else []) + (right_fg.primary_key if primary_key else [])
+            right = self._frame(join["query"], right_extra)
+            # Columns the result already has get the feature group prefix, as Hopsworks does for the training data
+            prefix = join["prefix"] or f"{right_fg.name}_{right_fg.version}_"
+            rename = {c: f"{prefix}{c}" for c in right.columns if c in result.columns}
+            right = right.rename(columns=rename)
+            right_on = [rename.get(c, c) for c in join["on"]]
+            if left_time and right_time:
+                result = asof_join.asof_join(result, right, join["on"], right_on, left_time, rename.get(right_time, right_time))
+            else:
+                result = result.merge(right, left_on=join["on"], right_on=right_on, how="left")
+            keep += [rename.get(c, c) for c in join["query"].features]
+            if primary_key:
+                keys.update({rename.get(c, c): right_fg.key_column(c) for c in right_fg.primary_key})
+
+        for column, key_column in keys.items():
+            result[key_column] = result[column]
+        keep += list(keys.values())
+        if event_time and left_time:
+            keep.append(left_time)
+
+        order = [c for c in left_fg.primary_key + ([left_time] if left_time else []) if c in result.columns]
+        if order:
+            result = result.sort_values(order, kind="stable")
+        return result[[c for c in dict.fromkeys(keep) if c in result.columns]].reset_index(drop=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        fg = self.feature_group
+        return {
+            "feature_group": fg.name,
+            "version": fg.version,
+            "features": self.features,
+            "filters": [f.to_dict() for f in self.filters],
+            "joins": [{"query": j["query"].to_dict(), "on": j["on"], "prefix": j["prefix"]} for j in self.joins],
+        }
+
+    @classmethod
+    def from_dict(cls, store: "LocalFeatureStore", data: Dict[str, Any]) -> "Query":
+        query = cls(store.get_feature_group(data["feature_group"], data["version"]), data["features"])
+        query.filters = [Filter.from_dict(f) for f in data["filters"]]
+        for join in data["joins"]:
+            query.join(cls.from_dict(store, join["query"]), on=join["on"], prefix=join["prefix"])
+        return query
+
+
+class LocalFeatureView:
+    """A query with labels; splits by the event time of the query's first feature group."""
+
+    def __init__(self, store: "LocalFeatureStore", name: str, version: int, query: Query, labels: List[str], description: str = ""):
+        self._store = store
+        self.name = name
+        self.version = version
+        self.query = query
+        self.labels = list(labels)
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"LocalFeatureView({self.name!r}, {self.version})"
+
+    def _split_labels(self, df: pd.DataFrame):
+        return df.drop(columns=self.labels), df[self.labels]
+
+    def train_test_split(
+        self,
+        test_size: Optional[float] = None,
+        train_start: Any = None,
+        train_end: Any = None,
+        test_start: Any = None,
+        test_end: Any = None,
+        primary_key: bool = False,
+        event_time: bool = False,
+        **kwargs,
+    ):
+        """Returns X_train, X_test, y_train, y_test like hsfs."""
+        df = self.query.read(primary_key=primary_key, event_time=True)
+        time_col = self.query.feature_group.event_time
+        times = pd.to_datetime(df[time_col]).dt.tz_localize(None)
+        if test_start is None:
+            if test_size is None:
+                raise ValueError("Either test_start or test_size is needed")
+            test_start = times.quantile(1 - test_size)
+        test_start = pd.Timestamp(test_start).tz_localize(None)
+        train_mask = times < test_start
+        test_mask = times >= test_start
+        if train_start is not None:
+            train_mask &= times >= pd.Timestamp(train_start).tz_localize(None)
+        if train_end is not None:
+            train_mask &= times < pd.Timestamp(train_end).tz_localize(None)
+        if test_end is not None:
+            test_mask &= times < pd.Timestamp(test_end).tz_localize(None)
+        if not event_time and time_col not in self.query.features:
+            df = df.drop(columns=[time_col])
+
+        train, test = df[train_mask].reset_index(drop=True), df[test_mask].reset_index(drop=True)
+        X_train, y_train = self._split_labels(train)
+        X_test, y_test = self._split_labels(test)
+        return X_train, X_test, y_train, y_test
+
+    def get_batch_data(self, start_time: Any = None, end_time: Any = None, **kwargs) -> pd.DataFrame:
+        df = self.query.read(event_time=True)
+        time_col = self.query.feature_group.event_time
+        times = pd.to_datetime(df[time_col]).dt.tz_localize(None)
+        mask = pd.Series(True, index=df.index)
+        if start_time is not None:
+            mask &= times >= pd.Timestamp(start_time).tz_localize(None)
+        if end_time is not None:
+            mask &= times < pd.Timestamp(end_time).tz_localize(None)
+        df = df[mask]
+        if time_col not in self.query.features:
+            df = df.drop(columns=[time_col])
+        return df.drop(columns=self.labels, errors="ignore").reset_index(drop=True)
+
+    def delete(self) -> None:
+        (self._store.root / "_views" / f"{self.name}_{self.version}.json").unlink(missing_ok=True)
+        self._store._forget_view(self.name, self.version)
+
+
+class LocalFeatureStore:
+    def __init__(self, root: Path = LOCAL_STORE_DIR, project_name: str = "local"):
+        self.root = Path(root) / "feature_store"
+        self.project_name = project_name
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._groups: Dict[tuple, LocalFeatureGroup] = {}
+        self._views: Dict[tuple, LocalFeatureView] = {}
+
+    def _forget(self, name: str, version: int) -> None:
+        self._groups.pop((name, version), None)
+
+    def _forget_view(self, name: str, version: int) -> None:
+        self._views.pop((name, version), None)
+
+    def get_feature_group(self, name: str, version: int = 1) -> LocalFeatureGroup:
+        key = (name, version)
+        if key not in self._groups:
+            metadata_path = self.root / f"{name}_{version}" / METADATA_FILE
+            if not metadata_path.exists():
+                raise FileNotFoundError(f"Feature group {name}/{version} does not exist in {self.root}")
+            with metadata_path.open("r", encoding="utf-8") as fp:
+                self._groups[key] = LocalFeatureGroup(self, name, version, json.load(fp))
+        return self._groups[key]
+
+    def get_or_create_feature_group(
+        self,
+        name: str,
+        version: int = 1,
+        description: str = "",
+        primary_key: Optional[Sequence[str]] = None,
+        event_time: Optional[str] = None,
+        **kwargs,
+    ) -> LocalFeatureGroup:
+        try:
+            return self.get_feature_group(name, version)
+        except FileNotFoundError:
+            metadata = {"primary_key": list(primary_key or []), "event_time": event_time, "description": description}
+            fg = LocalFeatureGroup(self, name, version, metadata)
+            fg._save_metadata()
+            self._groups[(name, version)] = fg
+            return fg
+
+    def get_feature_groups(self, name: str) -> List[LocalFeatureGroup]:
+        return [
+            self.get_feature_group(name, int(path.parent.name.rsplit("_", 1)[1]))
+            for path in sorted(self.root.glob(f"{name}_*/{METADATA_FILE}"))
+        ]
+
+    def get_feature_view(self, name: str, version: int = 1) -> LocalFeatureView:
+        key = (name, version)
+        if key not in self._views:
+            view_path = self.root / "_views" / f"{name}_{version}.json"
+            if not view_path.exists():
+                raise FileNotFoundError(f"Feature view {name}/{version} does not exist in {self.root}")
+            with view_path.open("r", encoding="utf-8") as fp:
+                data = json.load(fp)
+            self._views[key] = LocalFeatureView(
+                self, name, version, Query.from_dict(self, data["query"]), data["labels"], data.get("description", "")
+            )
+        return self._views[key]
+
+    def get_or_create_feature_view(
+        self,
+        name: str,
+        version: int = 1,
+        query: Optional[Query] = None,
+        labels: Optional[Sequence[str]] = None,
+        description: str = "",
+        **kwargs,
+    ) -> LocalFeatureView:
+        try:
+            return self.get_feature_view(name, version)
+        except FileNotFoundError:
+            view = LocalFeatureView(self, name, version, query, list(labels or []), description)
+            view_path = self.root / "_views" / f"{name}_{version}.json"
+            view_path.parent.mkdir(parents=True, exist_ok=True)
+            with view_path.open("w", encoding="utf-8") as fp:
+                json.dump({"query": query.to_dict(), "labels": view.labels, "description": description}, fp, indent=2)
+            self._views[(name, version)] = view
+            return view
+
+    def get_feature_views(self, name: str) -> List[LocalFeatureView]:
+        return [
+            self.get_feature_view(name, int(path.stem.rsplit("_", 1)[1]))
+            for path in sorted((self.root / "_views").glob(f"{name}_*.json"))
+        ]
+
+
+class LocalModel:
+    """A registry model: a copied artifact directory plus its metrics."""
+
+    def __init__(self, registry: "LocalModelRegistry", name: str, version: Optional[int] = None, metrics: Optional[dict] = None, description: str = ""):
+        self._registry = registry
+        self.name = name
+        self.version = version
+        self.training_metrics = dict(metrics or {})
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"LocalModel({self.name!r}, {self.version})"
+
+    @property
+    def path(self) -> Path:
+        return self._registry.root / self.name / str(self.version)
+
+    def save(self, model_path: str, **kwargs) -> "LocalModel":
+        """Registers the files in `model_path` as the next version of the model."""
+        model_root = self._registry.root / self.name
+        versions = [int(p.name) for p in model_root.iterdir() if p.name.isdigit()] if model_root.exists() else []
+        self.version = self.version or max(versions, default=0) + 1
+        shutil.rmtree(self.path, ignore_errors=True)
+        shutil.copytree(model_path, self.path)
+        with (self.path / METADATA_FILE).open("w", encoding="utf-8") as fp:
+            json.dump({"metrics": self.training_metrics, "description": self.description}, fp, indent=2)
+        return self
+
+    def download(self, local_path: Optional[str] = None) -> str:
+        target = Path(local_path) if local_path is not None else Path.cwd() / f"{self.name}_{self.version}"
+        shutil.copytree(self.path, target, dirs_exist_ok=True, ignore=shutil.ignore_patterns(METADATA_FILE))
+        return str(target)
+
+    def delete(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class _ModelFactory:
+    def __init__(self, registry: "LocalModelRegistry"):
+        self._registry = registry
+
+    def create_model(self, name: str, metrics: Optional[dict] = None, description: str = "", version: Optional[int] = None, **kwargs) -> LocalModel:
+        return LocalModel(self._registry, name, version, metrics, description)
+
+
+class LocalModelRegistry:
+    def __init__(self, root: Path = LOCAL_STORE_DIR):
+        self.root = Path(root) / "models"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.python = self.sklearn = self.xgboost = _ModelFactory(self)
+
+    def get_model(self, name: str, version: int = 1) -> LocalModel:
+        path = self.root / name / str(version)
+        if not path.exists():
+            raise FileNotFoundError(f"Model {name}/{version} does not exist in {self.root}")
+        with (path / METADATA_FILE).open("r", encoding="utf-8") as fp:
+            metadata = json.load(fp)
+        return LocalModel(self, name, version, metadata["metrics"], metadata.get("description", ""))
+
+    def get_models(self, name: str) -> List[LocalModel]:
+        model_root = self.root / name
+        if not model_root.exists():
+            return []
+        return [self.get_model(name, int(p.name)) for p in sorted(model_root.iterdir()) if p.name.isdigit()]
+
+
+class LocalDatasetApi:
+    """Project files (`Resources/...`) kept under `<root>/datasets`."""
+
+    def __init__(self, root: Path = LOCAL_STORE_DIR):
+        self.root = Path(root) / "datasets"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, remote_path: str) -> Path:
+        return self.root / remote_path.strip("/")
+
+    def exists(self, remote_path: str) -> bool:
+        return self._path(remote_path).exists()
+
+    def mkdir(self, remote_path: str) -> str:
+        self._path(remote_path).mkdir(parents=True, exist_ok=True)
+        return remote_path
+
+    def upload(self, local_path: str, upload_path: str, overwrite: bool = False, **kwargs) -> str:
+        target = self._path(upload_path) / Path(local_path).name
+        if target.exists() and not overwrite:
+            raise FileExistsError(f"{upload_path}/{target.name} exists, pass overwrite=True")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_path, target)
+        return f"{upload_path}/{target.name}"
+
+    def download(self, path: str, local_path: Optional[str] = None, overwrite: bool = False, **kwargs) -> str:
+        source = self._path(path)
+        if not source.exists():
+            raise FileNotFoundError(f"{path} does not exist in {self.root}")
+        target_dir = Path(local_path) if local_path is not None else Path.cwd()
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / source.name
+        if target.exists() and not overwrite:
+            raise FileExistsError(f"{target} exists, pass overwrite=True")
+        shutil.copyfile(source, target)
+        return str(target)
+
+
+class LocalProject:
+    """What `hopsworks.login()` returns, backed by a local directory."""
+
+    def __init__(self, root: Path = LOCAL_STORE_DIR, name: str = "local"):
+        self.root = Path(root)
+        self.name = name
+        self._feature_store = LocalFeatureStore(self.root, name)
+        self._model_registry = LocalModelRegistry(self.root)
+        self._dataset_api = LocalDatasetApi(self.root)
+
+    def get_feature_store(self, *args, **kwargs) -> LocalFeatureStore:
+        return self._feature_store
+
+    def get_model_registry(self, *args, **kwargs) -> LocalModelRegistry:
+        return self._model_registry
+
+    def get_dataset_api(self) -> LocalDatasetApi:
+        return self._dataset_api
+
+    def get_url(self) -> str:
+        return self.root.resolve().as_uri()
@@ -0,0 +1,126 @@
+"""
+Local cache of model registry artifacts.
+
+Registry models are immutable per (name, version), so a version is downloaded once into
+`CACHE_DIR/<name>/<version>/` together with a manifest of SHA-256 checksums of its files. Later runs
+check the files against the manifest and skip the download; a missing or corrupted file triggers a
+fresh download. Loaded XGBoost models are additionally kept in a small in-process LRU, so the same
+model version is verified and parsed once per process.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+CACHE_DIR = Path(os.getenv("AQ_MODEL_CACHE", Path(__file__).resolve().parent / "data" / "model_cache"))
+MANIFEST_FILE = "_manifest.json"
+LRU_SIZE = 16
+
+_loaded: "OrderedDict[tuple, Any]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def file_checksum(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with Path(file_path).open("rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _checksums(model_dir: Path) -> Dict[str, str]:
+    return {
+        path.relative_to(model_dir).as_posix(): file_checksum(path)
+        for path in sorted(model_dir.rglob("*"))
+        if path.is_file() and path.name != MANIFEST_FILE
+    }
+
+
+def _version_dir(name: str, version: int, root: Path) -> Path:
+    return Path(root) / name / str(version)
+
+
+def cache_problem(name: str, version: int, root: Path = CACHE_DIR) -> Optional[str]:
+    """Why the cached artifacts of `name`/`version` cannot be used, or None if they can."""
+    model_dir = _version_dir(name, version, root)
+    try:
+        with (model_dir / MANIFEST_FILE).open("r", encoding="utf-8") as fp:
+            manifest = json.load(fp)
+    except FileNotFoundError:
+        return "not cached"
+    except json.JSONDecodeError:
+        return "manifest is unreadable"
+    if _checksums(model_dir) != manifest["files"]:
+        return "files do not match their checksums"
+    return None
+
+
+def cached_dir(name: str, version: int, root: Path = CACHE_DIR) -> Optional[Path]:
+    """The cached artifact directory if it is complete and every file matches its checksum."""
+    return _version_dir(name, version, root) if cache_problem(name, version, root) is None else None
+
+
+def model_dir(name: str, version: int, fetch: Callable[[], Any], root: Path = CACHE_DIR) -> Path:
+    """
+    Local directory with the artifacts of model `name`/`version`. `fetch` returns the registry model
+    and is only called on a cache miss, so a hit needs no registry round-trip at all. Use
+    `cache_problem` beforehand to tell why a version will be downloaded again.
+    """
+    cached = cached_dir(name, version, root)
+    if cached is not None:
+        return cached
+
+    target = _version_dir(name, version, root)
+    staging = target.with_name(f".{target.name}.download")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    downloaded = Path(fetch().download(local_path=str(staging)))
+    if downloaded != staging:
+        # Some client versions nest the artifacts in a subfolder of local_path
+        for path in list(downloaded.iterdir()):
+            shutil.move(str(path), staging / path.name)
+        if staging in downloaded.parents:
+            shutil.rmtree(downloaded, ignore_errors=True)
+
+    with (staging / MANIFEST_FILE).open("w", encoding="utf-8") as fp:
+        json.dump({"name": name, "version": version, "files": _checksums(staging)}, fp, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    staging.replace(target)
+    return target
+
+
+def load_xgboost(
+    name: str,
+    version: int,
+    file_name: str,
+    fetch: Callable[[], Any],
+    root: Path = CACHE_DIR,
+):
+    """An XGBRegressor loaded from the cached artifacts, reused from the in-process LRU when possible."""
+    key = (str(root), name, version, file_name)
+    with _loaded_lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            return _loaded[key]
+
+    model_path = model_dir(name, version, fetch, root) / file_name
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor()
+    model.load_model(str(model_path))
+    with _loaded_lock:
+        _loaded[key] = model
+        while len(_loaded) > LRU_SIZE:
+            _loaded.popitem(last=False)
+    return model
+
+
+def clear_loaded() -> None:
+    with _loaded_lock:
+        _loaded.clear()
@@ -0,0 +1,239 @@
+"""
+Compact storage of the per-sensor models.
+
+Every feature variant (`backend/air_quality_models/pm25_lag_1`, ...) holds one model per sensor in
+`<variant>/<country>_<city>_<street>/model_<...>.json`. XGBoost's UBJSON format stores the same
+booster in binary, which is smaller on disk and parses several times faster than the text JSON.
+
+A variant can additionally be packed into a single `models.aqpack` file: a header, a JSON index of
+sensor -> (offset, length, sha256) and the UBJSON boosters back to back. `PackedModelStore` only reads
+the index when it opens the pack and reads a sensor's bytes when that sensor is first asked for.
+
+    python -m backend.model_store backend/air_quality_models/pm25*            # .json -> .ubj
+    python -m backend.model_store backend/air_quality_models/pm25* --pack     # and one pack per variant
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+PACK_FILE = "models.aqpack"
+MODEL_FORMATS = ("ubj", "json")
+PACK_MAGIC = b"AQPACK1\0"
+_HEADER = struct.Struct("<8sQ")
+LRU_SIZE = 32
+
+_stores: Dict[tuple, "PackedModelStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def model_file(variant_dir: Path, name: str, fmt: str) -> Path:
+    return Path(variant_dir) / name / f"model_{name}.{fmt}"
+
+
+def sensor_names(variant_dir: Path) -> List[str]:
+    """Sensors of a variant that have a model file in either format."""
+    variant_dir = Path(variant_dir)
+    return sorted(
+        path.name
+        for path in variant_dir.iterdir()
+        if path.is_dir() and any(model_file(variant_dir, path.name, fmt).exists() for fmt in MODEL_FORMATS)
+    )
+
+
+def _booster_bytes(variant_dir: Path, name: str) -> bytes:
+    """UBJSON bytes of one sensor's booster, read as is from .ubj or converted from .json."""
+    ubj_path = model_file(variant_dir, name, "ubj")
+    if ubj_path.exists():
+        return ubj_path.read_bytes()
+    return _json_to_ubj(model_file(variant_dir, name, "json"))
+
+
+def _json_to_ubj(json_path: Path) -> bytes:
+    from xgboost import Booster
+
+    booster = Booster()
+    booster.load_model(str(json_path))
+    return bytes(booster.save_raw("ubj"))
+
+
+def export_ubj(variant_dir: Path, remove_json: bool = False) -> List[Path]:
+    """Writes `model_<name>.ubj` next to every JSON model of the variant. Returns the files written."""
+    variant_dir = Path(variant_dir)
+    written = []
+    for name in sensor_names(variant_dir):
+        json_path = model_file(variant_dir, name, "json")
+        if not json_path.exists():
+            continue
+        # The JSON is what training wrote last, so it always wins over an older .ubj
+        ubj_path = model_file(variant_dir, name, "ubj")
+        ubj_path.write_bytes(_json_to_ubj(json_path))
+        if remove_json:
+            json_path.unlink()
+        written.append(ubj_path)
+    return written
+
+
+def save_model(model: Any, path: Path) -> Path:
+    """Saves a booster and deletes its copy in the other format, which a loader could pick up instead."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # XGBoost picks the format from the extension, ubj is the compact binary one
+    model.save_model(str(path))
+    for fmt in MODEL_FORMATS:
+        other = path.with_suffix(f".{fmt}")
+        if other != path:
+            other.unlink(missing_ok=True)
+    return path
+
+
+def save_sensor_model(model: Any, variant_dir: Path, name: str, fmt: str = "json") -> Path:
+    """
+    Saves one sensor's model of a variant. The variant's pack is deleted because it still holds the
+    old booster of the sensor; `pack_variant` rebuilds it once every sensor is trained.
+    """
+    (Path(variant_dir) / PACK_FILE).unlink(missing_ok=True)
+    return save_model(model, model_file(variant_dir, name, fmt))
+
+
+def pack_variant(variant_dir: Path, out_path: Optional[Path] = None) -> Path:
+    """Packs the boosters of all sensors of a variant into one file with an index. Returns its path."""
+    variant_dir = Path(variant_dir)
+    out_path = Path(out_path) if out_path is not None else variant_dir / PACK_FILE
+
+    index: Dict[str, Dict[str, Any]] = {}
+    blobs = []
+    offset = 0
+    for name in sensor_names(variant_dir):
+        blob = _booster_bytes(variant_dir, name)
+        index[name] = {"offset": offset, "length": len(blob), "sha256": hashlib.sha256(blob).hexdigest()}
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = json.dumps({"format": "ubj", "variant": variant_dir.name, "models": index}).encode("utf-8")
+    staging = out_path.with_name(f".{out_path.name}.new")
+    with staging.open("wb") as fp:
+        fp.write(_HEADER.pack(PACK_MAGIC, len(header)))
+        fp.write(header)
+        for blob in blobs:
+            fp.write(blob)
+    staging.replace(out_path)
+    return out_path
+
+
+class PackedModelStore:
+    """Read access to a pack written by `pack_variant`; models are parsed on first use and kept in an LRU."""
+
+    def __init__(self, path: Path, lru_size: int = LRU_SIZE):
+        self.path = Path(path)
+        self.lru_size = lru_size
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()
+        with self.path.open("rb") as fp:
+            magic, header_length = _HEADER.unpack(fp.read(_HEADER.size))
+            if magic != PACK_MAGIC:
+                raise ValueError(f"{self.path} is not a model pack")
+            header = json.loads(fp.read(header_length))
+        self.variant = header["variant"]
+        self.index: Dict[str, Dict[str, Any]] = header["models"]
+        self._data_start = _HEADER.size + header_length
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def names(self) -> List[str]:
+        return list(self.index)
+
+    def raw(self, name: str) -> bytes:
+        """UBJSON bytes of one booster, checked against the index."""
+        entry = self.index[name]
+        with self.path.open("rb") as fp:
+            fp.seek(self._data_start + entry["offset"])
+            blob = fp.read(entry["length"])
+        if hashlib.sha256(blob).hexdigest() != entry["sha256"]:
+            raise ValueError(f"Model {name} in {self.path} does not match its checksum")
+        return blob
+
+    def load(self, name: str):
+        """The XGBRegressor of sensor `name`."""
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name]
+
+        from xgboost import XGBRegressor
+
+        model = XGBRegressor()
+        model.load_model(bytearray(self.raw(name)))
+        with self._lock:
+            self._loaded[name] = model
+            while len(self._loaded) > self.lru_size:
+                self._loaded.popitem(last=False)
+        return model
+
+
+def open_pack(path: Path) -> PackedModelStore:
+    """The store of a pack, shared per process until the file is rewritten."""
+    path = Path(path).resolve()
+    key = (str(path), path.stat().st_mtime_ns)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = PackedModelStore(path)
+        return _stores[key]
+
+
+def load_sensor_model(variant_dir: Path, name: str):
+    """One sensor's model of a variant, from the pack if there is one, else from .ubj or .json."""
+    variant_dir = Path(variant_dir)
+    pack_path = variant_dir / PACK_FILE
+    if pack_path.exists():
+        store = open_pack(pack_path)
+        if name in store:
+            return store.load(name)
+
+    from xgboost import XGBRegressor
+
+    model = XGBRegressor()
+    for fmt in MODEL_FORMATS:
+        path = model_file(variant_dir, name, fmt)
+        if path.exists():
+            model.load_model(str(path))
+            return model
+    raise FileNotFoundError(f"No model for {name} in {variant_dir}")
+
+
+def _size(paths: Iterable[Path]) -> int:
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("variants", nargs="+", type=Path, help="Variant directories, e.g. backend/air_quality_models/pm25_lag_1")
+    parser.add_argument("--pack", action="store_true", help=f"Also pack each variant into {PACK_FILE}")
+    parser.add_argument("--remove-json", action="store_true", help="Delete the JSON models once converted")
+    args = parser.parse_args()
+
+    for variant_dir in args.variants:
+        names = sensor_names(variant_dir) if variant_dir.is_dir() else []
+        if not names:
+            continue
+        json_size = _size(model_file(variant_dir, name, "json") for name in names)
+        written = export_ubj(variant_dir, remove_json=args.remove_json)
+        line = f"{variant_dir}: {len(written)} models, json {json_size / 1e6:.1f} MB -> ubj {_size(written) / 1e6:.1f} MB"
+        if args.pack:
+            pack_path = pack_variant(variant_dir)
+            line += f", pack {pack_path.stat().st_size / 1e6:.1f} MB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,14 @@ class HopsworksSettings(BaseSettings):
     
     MLFS_DIR: Path = Path(__file__).parent
 
+    # Feature store backend. "local" keeps feature groups, views, models and files in LOCAL_STORE_DIR
+    # (backend/local_store.py), so the pipelines run without a Hopsworks cluster
+    FEATURE_STORE_BACKEND: Literal["hopsworks", "local"] = "hopsworks"
+    LOCAL_STORE_DIR: Path = Path(__file__).parent.parent / "data" / "local_store"
+    # Training data: the feature view's train_test_split, or "local" to as-of join the local
+    # mirrors of the feature groups (backend/asof_join.py)
+    TRAINING_JOIN: Literal["feature_view", "local"] = "feature_view"
+
     # For hopsworks.login(), set as environment variables if they are not already set as env variables
     HOPSWORKS_API_KEY: SecretStr | None = None
     HOPSWORKS_PROJECT: str | None = None
@@ -79,9 +87,9 @@ class HopsworksSettings(BaseSettings):
 
         # --- Check required .env values ---
         missing = []
-        # 1. HOPSWORKS_API_KEY
+        # 1. HOPSWORKS_API_KEY, not needed by the local backend
         api_key = self.HOPSWORKS_API_KEY or os.getenv("HOPSWORKS_API_KEY")
-        if not api_key:
+        if not api_key and self.FEATURE_STORE_BACKEND == "hopsworks":
             missing.append("HOPSWORKS_API_KEY")
         # 2. AQICN_API_KEY
         aqicn_api_key = self.AQICN_API_KEY or os.getenv("AQICN_API_KEY")
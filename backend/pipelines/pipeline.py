@@ -0,0 +1,776 @@
+"""
+In-process versions of the backfill, training and inference notebooks.
+
+The notebooks run one sensor (and one lag feature) per Jupyter kernel through papermill. Here the
+same steps are plain functions that share one PipelineContext, so a run logs into Hopsworks and
+fetches the feature groups once and then iterates the sensors inside the same process.
+"""
+import datetime
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from backend import asof_join, feature_engine, feature_mirror, forecast_bundle, lag_state, model_cache, model_store, session, split_cache, util
+from backend.models import config
+
+# Shipped with the package, so the aq-* commands find them from any working directory
+SENSORS_FILE = str(Path(__file__).resolve().parent.parent / "sensors" / "sensors.yml")
+LAGS_FILE = str(Path(__file__).resolve().parent.parent / "models" / "lags.yml")
+MODELS_DIR = "backend/air_quality_models"
+
+# The weather feature group is keyed by city, all Stockholm sensors share these coordinates
+CITY_COORDINATES = {"stockholm": (59.33, 18.07)}
+TEST_START = datetime.datetime(2025, 5, 1)
+
+AIR_QUALITY_FG = "air_quality_with_all_lags"
+WEATHER_FG = "weather"
+MONITOR_FG = "aq_predictions_general"
+GENERAL_MODEL = "air_quality_xgboost_model_general"
+GLOBAL_MODEL = "air_quality_xgboost_model_global"
+DIRECT_MODEL = "air_quality_xgboost_model_direct"
+SENSOR_CATEGORIES_FILE = "sensor_categories.json"
+# Forecast days of the direct models, the length of the weather forecast
+DIRECT_HORIZONS = 7
+
+
+def load_sensors(file_path: str = SENSORS_FILE) -> list[dict]:
+    with open(file_path, "r") as f:
+        return yaml.safe_load(f)["sensors"]
+
+
+def load_lag_features(file_path: str = LAGS_FILE) -> list[str]:
+    with open(file_path, "r") as f:
+        return [lag["feature"] for lag in yaml.safe_load(f)["lags"]]
+
+
+# File and model name friendly street, as used for the model directories and registry names
+street_slug = util.street_slug
+
+
+@dataclass
+class PipelineContext:
+    """State shared by every step of a run; Hopsworks handles come from the process-wide session."""
+
+    settings: Any
+    session: session.HopsworksSession
+    feature_views: dict = field(default_factory=dict)
+    splits: dict = field(default_factory=dict)
+    mirrors: dict = field(default_factory=dict)
+
+    @classmethod
+    def login(cls, env_file: str = ".env") -> "PipelineContext":
+        settings = config.HopsworksSettings(_env_file=env_file)
+        local_store_dir = settings.LOCAL_STORE_DIR if settings.FEATURE_STORE_BACKEND == "local" else None
+        hopsworks_session = session.get_session(env_file, local_store_dir=local_store_dir)
+        # Log in now so a bad API key fails before any work starts
+        hopsworks_session.project
+        return cls(settings=settings, session=hopsworks_session)
+
+    @property
+    def project(self):
+        return self.session.project
+
+    @property
+    def fs(self):
+        return self.session.feature_store
+
+    def feature_group(self, name: str, version: int = 1):
+        return self.session.feature_group(name, version)
+
+    def _new_mirror(self, name: str) -> feature_mirror.FeatureGroupMirror:
+        factory = feature_mirror.weather_mirror if name == WEATHER_FG else feature_mirror.air_quality_mirror
+        # Mirrors of local feature groups live next to them, apart from the Hopsworks ones
+        local_store_dir = self.session.local_store_dir
+        root = feature_mirror.MIRROR_DIR if local_store_dir is None else local_store_dir / "mirror"
+        return factory(self.feature_group(name), root=root)
+
+    def mirror(self, name: str) -> feature_mirror.FeatureGroupMirror:
+        """Local Parquet mirror of the feature group, synced incrementally once per run."""
+        if name not in self.mirrors:
+            self.mirrors[name] = self._new_mirror(name)
+            self.mirrors[name].sync()
+        return self.mirrors[name]
+
+    def resync_mirror(self, name: str, values: list) -> None:
+        """Pulls the mirror partitions of `values` (streets or cities) again after a backfill inserted older rows for them."""
+        if name not in self.mirrors:
+            self.mirrors[name] = self._new_mirror(name)
+        self.mirrors[name].sync(resync=values)
+
+
+# ---------------------------------------------------------------------------
+# Backfill
+# ---------------------------------------------------------------------------
+
+def air_quality_expectation_suite():
+    import great_expectations as ge
+
+    suite = ge.core.ExpectationSuite(expectation_suite_name="aq_expectation_suite")
+    columns = ["pm25"] + [f"pm25_rolling_{lag}d" for lag in [2, 3]] + [f"pm25_lag_{lag}" for lag in [1, 2, 3]]
+    for column in columns:
+        suite.add_expectation(
+            ge.core.ExpectationConfiguration(
+                expectation_type="expect_column_min_to_be_between",
+                kwargs={"column": column, "min_value": -0.1, "max_value": 500.0, "strict_min": True},
+            )
+        )
+    return suite
+
+
+def weather_expectation_suite():
+    import great_expectations as ge
+
+    suite = ge.core.ExpectationSuite(expectation_suite_name="weather_expectation_suite")
+    for column in ["precipitation_sum", "wind_speed_10m_max"]:
+        suite.add_expectation(
+            ge.core.ExpectationConfiguration(
+                expectation_type="expect_column_min_to_be_between",
+                kwargs={"column": column, "min_value": -0.1, "max_value": 1000.0, "strict_min": True},
+            )
+        )
+    return suite
+
+
+def build_air_quality_history(sensor: dict) -> pd.DataFrame:
+    """Reads the sensor's historical CSV into the air quality schema, without the lag features."""
+    df = pd.read_csv(sensor["csv_file"], parse_dates=['date'], skipinitialspace=True)
+
+    df_aq = df[['date', 'pm25']].copy()
+    df_aq['pm25'] = df_aq['pm25'].astype('float32')
+    df_aq = df_aq.dropna()
+    df_aq['country'] = sensor["country"]
+    df_aq['city'] = sensor["city"]
+    df_aq['street'] = sensor["street"]
+    df_aq['url'] = sensor["aqicn_url"]
+    return df_aq
+
+
+def backfill_air_quality(ctx: PipelineContext, sensors: list[dict]) -> pd.DataFrame:
+    """Inserts the history of every sensor into the air quality feature group. Returns the inserted rows."""
+    air_quality_fg = ctx.session.get_or_create_feature_group(
+        name=AIR_QUALITY_FG,
+        description='Air Quality characteristics of each day',
+        version=1,
+        primary_key=['country', 'city', 'street'],
+        event_time="date",
+        expectation_suite=air_quality_expectation_suite(),
+    )
+
+    frames = []
+    for sensor in sensors:
+        print(f"Backfilling air quality for {sensor['street']}")
+        frames.append(build_air_quality_history(sensor))
+    # Lag, rolling and any extra features from lags.yml for all sensors in one pass
+    df_aq = pd.concat(frames, ignore_index=True)
+    df_aq = feature_engine.add_lag_features(df_aq, feature_engine.load_feature_specs()).dropna()
+    # Wait for the rows to land, the mirror partitions of these sensors are pulled again right after
+    air_quality_fg.insert(df_aq, wait=True)
+    ctx.resync_mirror(AIR_QUALITY_FG, list(df_aq['street'].unique()))
+    refresh_lag_state(ctx, list(df_aq['street'].unique()))
+
+    air_quality_fg.update_feature_description("date", "Date of measurement of air quality")
+    air_quality_fg.update_feature_description("country", "Country where the air quality was measured (sometimes a city in acqcn.org)")
+    air_quality_fg.update_feature_description("city", "City where the air quality was measured")
+    air_quality_fg.update_feature_description("street", "Street in the city where the air quality was measured")
+    for column in ["pm25", "pm25_rolling_3d", "pm25_rolling_2d", "pm25_lag_1", "pm25_lag_2", "pm25_lag_3"]:
+        air_quality_fg.update_feature_description(column, "Particles less than 2.5 micrometers in diameter (fine particles) pose health risk")
+    return df_aq
+
+
+def refresh_lag_state(ctx: PipelineContext, streets: list[str]) -> None:
+    """
+    Rebuilds the daily job's lag state of the backfilled sensors from their new history, so no
+    stale values stay in the ring buffers. Without a state the daily job builds one on its first run.
+    """
+    dataset_api = ctx.session.dataset_api
+    remote_file = f"{lag_state.REMOTE_DIR}/{lag_state.STATE_FILE}"
+    if not dataset_api.exists(remote_file):
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_api.download(remote_file, tmp_dir, overwrite=True)
+        state_file = Path(tmp_dir) / lag_state.STATE_FILE
+        state = lag_state.LagStateStore.load(state_file)
+        state.seed(ctx.mirror(AIR_QUALITY_FG).read(filters=[("street", "in", streets)]))
+        state.save(state_file)
+        dataset_api.upload(str(state_file), lag_state.REMOTE_DIR, overwrite=True)
+
+
+def backfill_weather(ctx: PipelineContext, air_quality_df: pd.DataFrame, today: datetime.date) -> None:
+    """Inserts the weather history once per city, from the earliest air quality observation in that city."""
+    weather_fg = ctx.session.get_or_create_feature_group(
+        name=WEATHER_FG,
+        description='Weather characteristics of each day',
+        version=1,
+        primary_key=['city'],
+        event_time="date",
+        expectation_suite=weather_expectation_suite(),
+    )
+
+    for city, city_df in air_quality_df.groupby("city"):
+        latitude, longitude = CITY_COORDINATES[city]
+        earliest_aq_date = city_df['date'].min().strftime('%Y-%m-%d')
+        weather_df = util.backfill_historical_weather(city, earliest_aq_date, str(today), latitude, longitude)
+        weather_fg.insert(weather_df, wait=True)
+    ctx.resync_mirror(WEATHER_FG, list(air_quality_df['city'].unique()))
+
+    weather_fg.update_feature_description("date", "Date of measurement of weather")
+    weather_fg.update_feature_description("city", "City where weather is measured/forecast for")
+    weather_fg.update_feature_description("temperature_2m_mean", "Temperature in Celsius")
+    weather_fg.update_feature_description("precipitation_sum", "Precipitation (rain/snow) in mm")
+    weather_fg.update_feature_description("wind_speed_10m_max", "Wind speed at 10m abouve ground")
+    weather_fg.update_feature_description("wind_direction_10m_dominant", "Dominant Wind direction over the dayd")
+
+
+def replace_secret(secrets_api: Any, name: str, value: str) -> None:
+    secret = secrets_api.get_secret(name)
+    if secret is not None:
+        secret.delete()
+        print(f"Replacing existing {name}")
+    secrets_api.create_secret(name, value)
+
+
+def register_secrets(ctx: PipelineContext, sensors: list[dict], today: datetime.date) -> None:
+    """
+    Checks the AQICN API key against the live feed of every sensor, then stores it and the sensor
+    location as the AQICN_API_KEY and SENSOR_LOCATION_JSON secrets the daily jobs read.
+    """
+    import requests
+
+    if ctx.settings is None or ctx.settings.AQICN_API_KEY is None:
+        raise ValueError("You need to set AQICN_API_KEY in .env")
+    aqicn_api_key = ctx.settings.AQICN_API_KEY.get_secret_value()
+
+    for sensor in sensors:
+        try:
+            util.get_pm25(sensor['aqicn_url'], sensor['country'], sensor['city'], sensor['street'], today, aqicn_api_key)
+        except requests.exceptions.RequestException:
+            print(f"It looks like the AQICN_API_KEY doesn't work for {sensor['street']}. Is the API key correct? Is the sensor URL correct?")
+
+    secrets_api = ctx.session.secrets_api
+    if secrets_api is None:
+        return
+    replace_secret(secrets_api, "AQICN_API_KEY", aqicn_api_key)
+    # One location, as the per-sensor backfill notebook left it after its last sensor
+    sensor = sensors[-1]
+    latitude, longitude = CITY_COORDINATES[sensor['city']]
+    replace_secret(secrets_api, "SENSOR_LOCATION_JSON", json.dumps({
+        "country": sensor['country'],
+        "city": sensor['city'],
+        "street": sensor['street'],
+        "aqicn_url": sensor['aqicn_url'],
+        "latitude": latitude,
+        "longitude": longitude,
+    }))
+
+
+def run_backfill(ctx: PipelineContext, sensors: list[dict], today: datetime.date = None) -> None:
+    today = today or datetime.date.today()
+    register_secrets(ctx, sensors, today)
+    air_quality_df = backfill_air_quality(ctx, sensors)
+    backfill_weather(ctx, air_quality_df, today)
+
+
+# ---------------------------------------------------------------------------
+# Training
+# ---------------------------------------------------------------------------
+
+def _column(df: pd.DataFrame, feature_group: str, name: str) -> str:
+    """Training data columns that clash between feature groups get a '<project>_<fg>_<version>_' prefix."""
+    if name in df.columns:
+        return name
+    suffix = f"{feature_group}_1_{name}"
+    for column in df.columns:
+        if column.endswith(suffix):
+            return column
+    raise KeyError(f"No column {name} from {feature_group} in training data")
+
+
+def get_training_split(ctx: PipelineContext, lag_feature: str, test_start: datetime.datetime = TEST_START):
+    """
+    Train/test split of the feature view for one lag feature. The split is materialized once per
+    lag feature and run, and reused by every sensor model trained on it. With TRAINING_JOIN=local
+    the same columns are built from the local feature group mirrors instead of by Hopsworks.
+
+    Splits are also kept on disk (see split_cache), keyed by the feature view, test_start, the join,
+    the lag feature's spec and the data versions of both feature groups, so later runs only
+    regenerate them after a change.
+    """
+    key = (lag_feature, test_start)
+    if key in ctx.splits:
+        return ctx.splits[key]
+
+    air_quality_fg = ctx.feature_group(AIR_QUALITY_FG)
+    weather_fg = ctx.feature_group(WEATHER_FG)
+    aq_features = ['pm25', 'date'] if lag_feature == 'pm25' else ['pm25', lag_feature, 'date']
+    selected_features = air_quality_fg.select(aq_features).join(weather_fg.select_features(), on=['city'])
+
+    feature_view = ctx.session.get_or_create_feature_view(
+        name=f'air_quality_fv_{lag_feature}',
+        description="weather features with air quality as the target",
+        version=1,
+        labels=['pm25'],
+        query=selected_features,
+    )
+    ctx.feature_views[lag_feature] = feature_view
+
+    # Syncing the mirrors is an incremental read, far cheaper than generating the training data
+    data_versions = [ctx.mirror(name).data_version() for name in (AIR_QUALITY_FG, WEATHER_FG)]
+    training_join = getattr(ctx.settings, "TRAINING_JOIN", "feature_view")
+    specs = feature_engine.feature_specs([lag_feature])
+    cache_key = split_cache.split_key(
+        feature_view.name, feature_view.version, test_start, data_versions,
+        training_join=training_join, feature=asdict(specs[0]) if specs else None,
+    )
+    cached = split_cache.load(cache_key)
+    if cached is not None:
+        print(f"Using the cached {lag_feature} training split")
+        ctx.splits[key] = cached
+        return cached
+
+    if training_join == "local":
+        start = time.perf_counter()
+        matrix = asof_join.training_matrix(ctx.mirror(AIR_QUALITY_FG).read(), ctx.mirror(WEATHER_FG).read(), lag_feature)
+        ctx.splits[key] = asof_join.split_by_date(matrix, test_start)
+        print(f"Joined {len(matrix)} {lag_feature} training rows locally in {time.perf_counter() - start:.2f}s")
+    else:
+        ctx.splits[key] = ctx.session.call("train_test_split", feature_view.train_test_split, test_start=test_start, primary_key=True)
+    ctx.splits[key] = split_cache.save(cache_key, ctx.splits[key])
+    return ctx.splits[key]
+
+
+def select_sensor_rows(X: pd.DataFrame, y: pd.DataFrame, country: str, city: str, street: str = None):
+    """Rows of one city (or one street of it), without the key columns. Returns (features, labels, street, date)."""
+    country_col = _column(X, AIR_QUALITY_FG, "country")
+    city_col = _column(X, AIR_QUALITY_FG, "city")
+    street_col = _column(X, AIR_QUALITY_FG, "street")
+    mask = (X[country_col] == country) & (X[city_col] == city)
+    if street is not None:
+        mask &= X[street_col] == street
+
+    rows = X[mask]
+    features = rows.drop(columns=['date', country_col, city_col, street_col, _column(X, WEATHER_FG, "city")])
+    return features, y[mask], rows[street_col], rows['date']
+
+
+def fit_and_evaluate(X_train: pd.DataFrame, y_train: pd.DataFrame, X_test: pd.DataFrame, y_test: pd.DataFrame, n_jobs: int = None, **params):
+    from xgboost import XGBRegressor
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    xgb_regressor = XGBRegressor(n_jobs=n_jobs, **params)
+    xgb_regressor.fit(X_train, y_train)
+
+    y_pred = xgb_regressor.predict(X_test)
+    mse = mean_squared_error(y_test.iloc[:, 0], y_pred)
+    r2 = r2_score(y_test.iloc[:, 0], y_pred)
+    print("MSE:", mse)
+    print("R squared:", r2)
+    return xgb_regressor, y_pred, {"MSE": str(mse), "R squared": str(r2)}
+
+
+def save_model_artifacts(
+    model, city: str, street: str, hindcast_df: pd.DataFrame, model_dir: str, name: str, model_format: str = "json"
+) -> None:
+    """
+    Writes the model (json or ubj), the hindcast plot and the feature importance plot into model_dir.
+    A copy of the model in the other format and the variant's pack are stale now and deleted.
+    """
+    import matplotlib.pyplot as plt
+    from xgboost import plot_importance
+
+    images_dir = model_dir + "/images"
+    os.makedirs(images_dir, exist_ok=True)
+
+    util.plot_air_quality_forecast(city, street, hindcast_df, images_dir + f"/pm25_hindcast_{name}.png", hindcast=True)
+
+    ax = plot_importance(model)
+    ax.figure.savefig(images_dir + f"/feature_importance_{name}.png")
+    plt.close(ax.figure)
+
+    model_store.save_sensor_model(model, Path(model_dir).parent, name, model_format)
+
+
+@dataclass
+class TrainingJob:
+    """Everything a worker process needs to train one sensor x lag feature model, without Hopsworks handles."""
+
+    sensor: dict
+    lag_feature: str
+    X_train: pd.DataFrame
+    y_train: pd.DataFrame
+    X_test: pd.DataFrame
+    y_test: pd.DataFrame
+    test_dates: pd.Series
+    n_jobs: int = None
+    model_format: str = "json"
+
+    @property
+    def name(self) -> str:
+        return f"{self.sensor['country']}_{self.sensor['city']}_{street_slug(self.sensor['street'])}"
+
+    @property
+    def model_dir(self) -> str:
+        return f"{MODELS_DIR}/{self.lag_feature}/{self.name}"
+
+
+def prepare_training_job(
+    ctx: PipelineContext, sensor: dict, lag_feature: str, n_jobs: int = None, model_format: str = "json"
+) -> TrainingJob:
+    country, city, street = sensor["country"], sensor["city"], sensor["street"]
+    X_train, X_test, y_train, y_test = get_training_split(ctx, lag_feature)
+
+    X_features, y_train_sensor, _, _ = select_sensor_rows(X_train, y_train, country, city, street)
+    X_test_features, y_test_sensor, _, test_dates = select_sensor_rows(X_test, y_test, country, city, street)
+    return TrainingJob(
+        sensor=dict(sensor),
+        lag_feature=lag_feature,
+        X_train=X_features[3:],
+        y_train=y_train_sensor[3:],
+        X_test=X_test_features,
+        y_test=y_test_sensor,
+        test_dates=test_dates,
+        n_jobs=n_jobs,
+        model_format=model_format,
+    )
+
+
+def run_training_job(job: TrainingJob) -> dict:
+    """Fits and evaluates one model and writes its artifacts. Runs in a worker process, so it only touches local files."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+    start = time.perf_counter()
+    model, y_pred, metrics = fit_and_evaluate(job.X_train, job.y_train, job.X_test, job.y_test, job.n_jobs)
+
+    hindcast_df = job.y_test.copy()
+    hindcast_df['predicted_pm25'] = y_pred
+    hindcast_df['date'] = job.test_dates
+    hindcast_df = hindcast_df.sort_values(by=['date'])
+
+    save_model_artifacts(
+        model, job.sensor["city"], job.sensor["street"], hindcast_df, job.model_dir, job.name, job.model_format
+    )
+    return {
+        "street": job.sensor["street"],
+        "lag_feature": job.lag_feature,
+        **metrics,
+        "train_rows": len(job.X_train),
+        "wall_time_s": round(time.perf_counter() - start, 2),
+    }
+
+
+def register_model(ctx: PipelineContext, job: TrainingJob, metrics: dict) -> None:
+    mr = ctx.session.model_registry
+    aq_model = mr.python.create_model(
+        name=f"air_quality_xgboost_model_{job.lag_feature}_{job.name}",
+        metrics={"MSE": metrics["MSE"], "R squared": metrics["R squared"]},
+        feature_view=ctx.feature_views[job.lag_feature],
+        description="Air Quality (PM2.5) predictor",
+    )
+    ctx.session.call("model_save", aq_model.save, job.model_dir)
+
+
+def train_sensor_model(ctx: PipelineContext, sensor: dict, lag_feature: str, register: bool = True, n_jobs: int = None) -> dict:
+    """Trains the model of one sensor on one lag feature in this process. Returns its test metrics."""
+    job = prepare_training_job(ctx, sensor, lag_feature, n_jobs)
+    metrics = run_training_job(job)
+    if register:
+        register_model(ctx, job, metrics)
+    return metrics
+
+
+def run_training(
+    ctx: PipelineContext,
+    sensors: list[dict],
+    lag_features: list[str],
+    max_workers: int = None,
+    register: bool = True,
+    model_format: str = "json",
+    pack: bool = False,
+) -> pd.DataFrame:
+    """
+    Trains the full sensor x lag feature grid and returns one metrics table with a row per model.
+
+    The training split is materialized once per lag feature in this process, then the jobs are fitted
+    on a process pool of max_workers (default: one per CPU). XGBoost gets cpu_count // max_workers
+    threads per job so the workers do not oversubscribe the cores. Models are registered from this
+    process once all fits are done, since the Hopsworks session cannot be shared with the workers.
+    With pack=True every lag feature's models are also packed into one indexed file (see model_store).
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    n_jobs = max(1, (os.cpu_count() or 1) // max_workers)
+
+    jobs = [
+        prepare_training_job(ctx, sensor, lag_feature, n_jobs, model_format)
+        for lag_feature in lag_features
+        for sensor in sensors
+    ]
+
+    start = time.perf_counter()
+    if max_workers == 1:
+        results = [run_training_job(job) for job in jobs]
+    else:
+        # spawn: forking a process that holds Hopsworks connections and threads is not safe
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(run_training_job, jobs))
+    for result in results:
+        print(f"Trained {result['lag_feature']} model for {result['street']} in {result['wall_time_s']}s")
+    print(f"Trained {len(jobs)} models in {time.perf_counter() - start:.1f}s with {max_workers} workers")
+    if pack:
+        for lag_feature in lag_features:
+            print(f"Packed {lag_feature} models into {model_store.pack_variant(f'{MODELS_DIR}/{lag_feature}')}")
+
+    if register:
+        for job, metrics in zip(jobs, results):
+            register_model(ctx, job, metrics)
+    return pd.DataFrame(results)
+
+
+def select_global_rows(X: pd.DataFrame, y: pd.DataFrame, categories: list[str] = None):
+    """
+    Rows of all sensors with the key columns replaced by the categorical sensor feature.
+    Returns (features, labels, categories); the categories are the sorted sensor ids unless given.
+    """
+    country_col = _column(X, AIR_QUALITY_FG, "country")
+    city_col = _column(X, AIR_QUALITY_FG, "city")
+    street_col = _column(X, AIR_QUALITY_FG, "street")
+    ids = util.sensor_ids(X[country_col], X[city_col], X[street_col])
+    categories = sorted(ids.unique()) if categories is None else categories
+
+    features = X.drop(columns=['date', country_col, city_col, street_col, _column(X, WEATHER_FG, "city")])
+    features[util.SENSOR_FEATURE] = pd.Categorical(ids, categories=categories)
+    return features, y, categories
+
+
+def train_global_model(ctx: PipelineContext, lag_feature: str, register: bool = True, model_format: str = "json") -> dict:
+    """
+    One model for all sensors on one lag feature, telling them apart by a native XGBoost categorical
+    sensor feature. The sensor ids are saved next to the model, since the category codes depend on them.
+    """
+    start = time.perf_counter()
+    X_train, X_test, y_train, y_test = get_training_split(ctx, lag_feature)
+    X_features, y_features, categories = select_global_rows(X_train, y_train)
+    X_test_features, y_test_features, _ = select_global_rows(X_test, y_test, categories)
+    # Like the per-sensor models, skip each sensor's first days whose lags are incomplete
+    warm = X_features.groupby(util.SENSOR_FEATURE, observed=True).cumcount().to_numpy() >= 3
+
+    model, _, metrics = fit_and_evaluate(
+        X_features[warm], y_features[warm], X_test_features, y_test_features,
+        enable_categorical=True, tree_method="hist",
+    )
+
+    model_dir = f"{MODELS_DIR}/global/{lag_feature}"
+    os.makedirs(model_dir, exist_ok=True)
+    model_store.save_model(model, f"{model_dir}/model_global.{model_format}")
+    with open(f"{model_dir}/{SENSOR_CATEGORIES_FILE}", "w", encoding="utf-8") as f:
+        json.dump(categories, f, indent=2, ensure_ascii=False)
+
+    if register:
+        aq_model = ctx.session.model_registry.python.create_model(
+            name=f"{GLOBAL_MODEL}_{lag_feature}",
+            metrics=metrics,
+            feature_view=ctx.feature_views[lag_feature],
+            description="Air Quality (PM2.5) predictor for all sensors",
+        )
+        ctx.session.call("model_save", aq_model.save, model_dir)
+    return {
+        "lag_feature": lag_feature,
+        **metrics,
+        "sensors": len(categories),
+        "train_rows": int(warm.sum()),
+        "wall_time_s": round(time.perf_counter() - start, 2),
+    }
+
+
+def direct_source_rows(features: pd.DataFrame, dates: pd.Series, horizon: int) -> np.ndarray:
+    """
+    For every row, the row of the same sensor `horizon` days earlier (-1 if there is none): the
+    day whose lag feature is the latest one known when forecasting `horizon` days ahead.
+    """
+    days = pd.to_datetime(dates)
+    if days.dt.tz is not None:
+        days = days.dt.tz_convert(None)
+    days = days.dt.normalize()
+    codes = features[util.SENSOR_FEATURE].cat.codes.to_numpy()
+    rows = pd.MultiIndex.from_arrays([codes, days])
+    return rows.get_indexer(pd.MultiIndex.from_arrays([codes, days - pd.Timedelta(days=horizon)]))
+
+
+def train_direct_models(
+    ctx: PipelineContext,
+    lag_feature: str,
+    horizons: int = DIRECT_HORIZONS,
+    register: bool = True,
+    model_format: str = "json",
+) -> list[dict]:
+    """
+    Direct multi-day forecast models for all sensors: model_h{d} predicts day d of a forecast
+    (0 = today) from the lag feature of the day before the forecast starts, with the weather of
+    day d. They share the features and the categorical sensor feature of the global model, and
+    are saved and registered together. Separate boosters rather than one multi-output booster,
+    because each day's rows carry that day's weather. Returns the metrics per forecast day.
+    """
+    start = time.perf_counter()
+    X_train, X_test, y_train, y_test = get_training_split(ctx, lag_feature)
+    _, _, categories = select_global_rows(X_train, y_train)
+    # Test rows look up their lag feature in the training period too, so shift on both together
+    X_all = pd.concat([X_train, X_test], ignore_index=True)
+    y_all = pd.concat([y_train, y_test], ignore_index=True)
+    is_test = np.r_[np.zeros(len(X_train), dtype=bool), np.ones(len(X_test), dtype=bool)]
+    features, labels, _ = select_global_rows(X_all, y_all, categories)
+    # Like the per-sensor models, the first days of each sensor have incomplete lags
+    warm = features.groupby(util.SENSOR_FEATURE, observed=True).cumcount().to_numpy() >= 3
+    lag_values = features[lag_feature].to_numpy()
+
+    model_dir = f"{MODELS_DIR}/direct/{lag_feature}"
+    os.makedirs(model_dir, exist_ok=True)
+    results, registry_metrics = [], {}
+    for day in range(horizons):
+        source = direct_source_rows(features, X_all['date'], day)
+        usable = np.flatnonzero(source >= 0)
+        usable = usable[warm[source[usable]]]
+        day_features = features.iloc[usable].copy()
+        day_features[lag_feature] = lag_values[source[usable]]
+        day_labels = labels.iloc[usable]
+        test = is_test[usable]
+
+        model, _, metrics = fit_and_evaluate(
+            day_features[~test], day_labels[~test], day_features[test], day_labels[test],
+            enable_categorical=True, tree_method="hist",
+        )
+        model_store.save_model(model, f"{model_dir}/model_h{day}.{model_format}")
+        registry_metrics.update({f"{name} day {day}": value for name, value in metrics.items()})
+        results.append({"lag_feature": lag_feature, "day": day, **metrics, "train_rows": int((~test).sum())})
+
+    with open(f"{model_dir}/{SENSOR_CATEGORIES_FILE}", "w", encoding="utf-8") as f:
+        json.dump(categories, f, indent=2, ensure_ascii=False)
+
+    if register:
+        aq_model = ctx.session.model_registry.python.create_model(
+            name=f"{DIRECT_MODEL}_{lag_feature}",
+            metrics=registry_metrics,
+            feature_view=ctx.feature_views[lag_feature],
+            description=f"Air Quality (PM2.5) {horizons} day direct predictors for all sensors",
+        )
+        ctx.session.call("model_save", aq_model.save, model_dir)
+    wall_time = round(time.perf_counter() - start, 2)
+    return [{**result, "wall_time_s": wall_time} for result in results]
+
+
+# ---------------------------------------------------------------------------
+# Inference
+# ---------------------------------------------------------------------------
+
+def load_general_model(ctx: PipelineContext, version: int = 1):
+    # Registry versions never change, the artifacts are downloaded once and checked by checksum after that
+    return model_cache.load_xgboost(
+        GENERAL_MODEL, version, "model_all_sensors.json",
+        fetch=lambda: ctx.session.model(GENERAL_MODEL, version),
+    )
+
+
+def load_global_model(ctx: PipelineContext, lag_feature: str, version: int = 1):
+    """The global model of a lag feature and the sensor ids of its categorical sensor feature."""
+    name = f"{GLOBAL_MODEL}_{lag_feature}"
+    fetch = lambda: ctx.session.model(name, version)
+    model_dir = model_cache.model_dir(name, version, fetch)
+    file_name = "model_global.ubj" if (model_dir / "model_global.ubj").exists() else "model_global.json"
+    with (model_dir / SENSOR_CATEGORIES_FILE).open("r", encoding="utf-8") as f:
+        categories = json.load(f)
+    return model_cache.load_xgboost(name, version, file_name, fetch), categories
+
+
+def load_direct_models(ctx: PipelineContext, lag_feature: str, version: int = 1):
+    """The direct models of a lag feature, one per forecast day, and the sensor ids of their sensor feature."""
+    name = f"{DIRECT_MODEL}_{lag_feature}"
+    fetch = lambda: ctx.session.model(name, version)
+    model_dir = model_cache.model_dir(name, version, fetch)
+    with (model_dir / SENSOR_CATEGORIES_FILE).open("r", encoding="utf-8") as f:
+        categories = json.load(f)
+    models = []
+    for day in range(DIRECT_HORIZONS):
+        file_name = f"model_h{day}.ubj" if (model_dir / f"model_h{day}.ubj").exists() else f"model_h{day}.json"
+        if not (model_dir / file_name).exists():
+            break
+        models.append(model_cache.load_xgboost(name, version, file_name, fetch))
+    return models, categories
+
+
+def run_predictions(
+    ctx: PipelineContext,
+    sensors: list[dict],
+    lag_feature: str,
+    today: datetime.datetime = None,
+    global_model: bool = False,
+    direct: bool = False,
+) -> pd.DataFrame:
+    """
+    Forecasts every sensor with the general model (or the global model of the lag feature, which
+    knows the sensors apart), plots forecasts and hindcasts and uploads them. With direct=True the
+    direct models of the lag feature forecast every day independently instead. The "pm25" feature
+    (no lag) forecasts from the weather alone.
+    """
+    today = today or datetime.datetime.now()
+    str_today = today.strftime('%Y_%m_%d')
+
+    aq_hist = ctx.mirror(AIR_QUALITY_FG).read(columns=util.SENSOR_KEYS + ["date", "pm25"])
+    weather_all = ctx.mirror(WEATHER_FG).read(since=today)
+
+    if lag_feature == "pm25":
+        # The "no_lag" option: the model forecasts from the weather features only
+        batch_data = util.predict_pm25_from_weather(load_general_model(ctx), weather_all, sensors)
+    elif direct:
+        models, sensor_categories = load_direct_models(ctx, lag_feature)
+        batch_data = util.predict_pm25_direct(models, weather_all, aq_hist, sensors, lag_feature, sensor_categories)
+    else:
+        if global_model:
+            model, sensor_categories = load_global_model(ctx, lag_feature)
+        else:
+            model, sensor_categories = load_general_model(ctx), None
+        batch_data = util.predict_pm25_for_sensors(model, weather_all, aq_hist, sensors, lag_feature, sensor_categories)
+    batch_data = batch_data.sort_values(by=['date'])
+
+    pred_file_path = f"{MODELS_DIR}/general/predictions"
+    forecast_images = util.plot_predictions(batch_data, sensors, pred_file_path, str_today)
+    uploads = list(forecast_images.values())
+
+    monitor_fg = ctx.session.get_or_create_feature_group(
+        name=MONITOR_FG,
+        description='Air Quality prediction monitoring',
+        version=1,
+        primary_key=['city', 'street', 'date', 'days_before_forecast_day'],
+        event_time="date",
+    )
+    monitor_fg.insert(batch_data, wait=True)
+
+    # Hindcast: predictions made for a day against what was measured on it, history read once
+    monitoring_df = ctx.session.call("monitor_read", monitor_fg.filter(monitor_fg.days_before_forecast_day == 0).read)
+    monitoring_df["date"] = pd.to_datetime(monitoring_df["date"]).dt.tz_localize(None)
+    hindcast_df = pd.merge(
+        monitoring_df[['street', 'date', 'predicted_pm25']], aq_hist[['street', 'date', 'pm25']], on=["street", "date"]
+    )
+    hindcast_images = util.plot_predictions(hindcast_df, sensors, pred_file_path, str_today, hindcast=True)
+    uploads.extend(hindcast_images.values())
+
+    dataset_api = ctx.session.dataset_api
+    if not dataset_api.exists("Resources/airquality"):
+        dataset_api.mkdir("Resources/airquality")
+    if not dataset_api.exists("Resources/airquality/general"):
+        dataset_api.mkdir("Resources/airquality/general")
+    for file_path in uploads:
+        ctx.session.call("dataset_upload", dataset_api.upload, file_path, "Resources/airquality/general", overwrite=True)
+
+    # One archive with the predictions and forecast images, so the app loads it with a single download
+    bundle_path = forecast_bundle.build_bundle(batch_data, sensors, forecast_images, f"{MODELS_DIR}/general/bundles", str_today)
+    forecast_bundle.publish_bundle(dataset_api, bundle_path)
+
+    return batch_data
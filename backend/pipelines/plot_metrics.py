@@ -1,34 +1,30 @@
-import hopsworks
 import yaml
 import matplotlib.pyplot as plt
 import os
-import sys
+from concurrent.futures import ThreadPoolExecutor
 
-# project_root = os.path.abspath(os.path.join(os.getcwd(), '../..'))
-project_root = "."
-if project_root not in sys.path:
-    sys.path.append(project_root)
 # Set the environment variables from the file <root_dir>/.env
+from backend import session
+from backend.pipelines import pipeline
 from backend.models import config
 settings = config.HopsworksSettings(_env_file=f".env")
 
-def collect_metrics():
+def collect_metrics(max_workers: int = 8):
     # Load sensors
-    with open("backend/sensors/sensors.yml", "r") as f:
+    with open(pipeline.SENSORS_FILE, "r") as f:
         config = yaml.safe_load(f)
 
     # Load lag features
-    with open("backend/models/lags.yml", "r") as f:
+    with open(pipeline.LAGS_FILE, "r") as f:
         lags = yaml.safe_load(f)
 
-    # Connect to Hopsworks
-    project = hopsworks.login(engine="python")
-    fs = project.get_feature_store()
-    mr = project.get_model_registry()
+    # One login for the whole run; model lookups go through the session's cache and retries
+    hopsworks_session = session.get_session()
 
     # Dictionary to store aggregated metrics
     aggregated = {}   # {lag_feature: {"mse": [...], "r2": [...]}}
 
+    model_names = []
     for lag_feature in lags["lags"]:
         lf = lag_feature["feature"]
 
@@ -43,20 +39,36 @@ def collect_metrics():
             street_new = street_new.replace('ö', 'oe')
             street = street_new.replace('å', 'oa')
 
-            model_name = f"air_quality_xgboost_model_{lf}_{country}_{city}_{street}"
+            model_names.append((lf, f"air_quality_xgboost_model_{lf}_{country}_{city}_{street}"))
 
-            try:
-                retrieved_model = mr.get_model(name=model_name, version=1)
-                print(retrieved_model)
-                metrics = retrieved_model.training_metrics  # {"mse": val, "r2": val}
-                print(metrics)
+    def _fetch(model_name):
+        try:
+            return hopsworks_session.model(model_name, 1)
+        except Exception as e:
+            print(f"⚠️ Could not load model: {model_name} ({e})")
+            return None
 
-                aggregated[lf]["mse"].append(metrics["MSE"])
-                aggregated[lf]["r2"].append(abs(metrics["r squared"]))
+    # Registry lookups are independent round-trips, so run them side by side
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        retrieved_models = list(pool.map(_fetch, [model_name for _, model_name in model_names]))
 
-            except Exception as e:
-                print(f"⚠️ Could not load model: {model_name} ({e})")
+    for (lf, model_name), retrieved_model in zip(model_names, retrieved_models):
+        if retrieved_model is None:
+            continue
+        print(retrieved_model)
+        try:
+            metrics = retrieved_model.training_metrics  # {"MSE": "val", "R squared": "val"}
+            print(metrics)
+            mse = float(metrics["MSE"])
+            r2 = abs(float(metrics["R squared"]))
+        except Exception as e:
+            print(f"⚠️ Could not read metrics of model: {model_name} ({e})")
+            continue
+
+        aggregated[lf]["mse"].append(mse)
+        aggregated[lf]["r2"].append(r2)
 
+    print(hopsworks_session.report())
     return aggregated
 
 
@@ -1,28 +1,13 @@
-import modal
-from pathlib import Path
-import os
-import papermill as pm
-import yaml
+from backend.pipelines import pipeline
 
 def run_backfill():
 
-    with open("backend/sensors/sensors.yml", "r") as f:
-        config = yaml.safe_load(f)
+    sensors = pipeline.load_sensors()
 
-    notebook_path = "backend/notebooks/backfill.ipynb"
-
-    for sensor in config["sensors"]:
-        pm.execute_notebook(
-            notebook_path,
-            "/dev/null",
-            parameters={
-                "country": sensor["country"],
-                "city": sensor["city"],
-                "street": sensor["street"],
-                "aqicn_url": sensor["aqicn_url"],
-                "csv_file": sensor["csv_file"],
-            }
-        )
+    # One login and one insert per feature group for all sensors, instead of a notebook kernel per sensor
+    ctx = pipeline.PipelineContext.login()
+    pipeline.run_backfill(ctx, sensors)
+    print(ctx.session.report())
 
 if __name__ == "__main__":
-    run_backfill()
\ No newline at end of file
+    run_backfill()
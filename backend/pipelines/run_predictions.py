@@ -1,31 +1,24 @@
-import modal
-from pathlib import Path
-import os
-import papermill as pm
-import yaml
+import argparse
 
-def run_predictions():
+from backend.pipelines import pipeline
 
-    with open("backend/sensors/sensors.yml", "r") as f:
-        config = yaml.safe_load(f)
+def run_predictions(global_model: bool = False, direct: bool = False):
 
-    with open("backend/models/lags.yml", "r") as f:
-        lags = yaml.safe_load(f)
+    sensors = pipeline.load_sensors()
+    lag_features = pipeline.load_lag_features()
 
-    notebook_path = "backend/notebooks/model_predict.ipynb"
+    # One login and one feature group read, all sensors are forecast together per lag feature
+    ctx = pipeline.PipelineContext.login()
+    for lag_feature in lag_features:
+        pipeline.run_predictions(ctx, sensors, lag_feature, global_model=global_model, direct=direct)
+    print(ctx.session.report())
 
-    for sensor in config["sensors"]:
-        for lag_feature in lags["lags"]:
-            pm.execute_notebook(
-                notebook_path,
-                "/dev/null",
-                parameters={
-                    "country": sensor["country"],
-                    "city": sensor["city"],
-                    "street": sensor["street"],
-                    "lag_feature": lag_feature["feature"],
-                }
-            )
+def main():
+    parser = argparse.ArgumentParser(description="Forecast every sensor for each lag feature.")
+    parser.add_argument("--global-model", action="store_true", help="Use the global model of each lag feature instead of the general model.")
+    parser.add_argument("--direct", action="store_true", help="Use the direct models of each lag feature, one per forecast day.")
+    args = parser.parse_args()
+    run_predictions(args.global_model, args.direct)
 
 if __name__ == "__main__":
-    run_predictions()
\ No newline at end of file
+    main()
@@ -1,31 +1,35 @@
-import modal
-from pathlib import Path
-import os
-import papermill as pm
-import yaml
+import argparse
 
-def run_training():
+import pandas as pd
 
-    with open("backend/sensors/sensors.yml", "r") as f:
-        config = yaml.safe_load(f)
+from backend.pipelines import pipeline
 
-    with open("backend/models/lags.yml", "r") as f:
-        lags = yaml.safe_load(f)
+def run_training(max_workers: int = None, model_format: str = "json", pack: bool = False, global_model: bool = False, direct: bool = False):
 
-    notebook_path = "backend/notebooks/train_model.ipynb"
+    sensors = pipeline.load_sensors()
+    lag_features = pipeline.load_lag_features()
 
-    for sensor in config["sensors"]:
-        for lag_feature in lags["lags"]:
-            pm.execute_notebook(
-                notebook_path,
-                "/dev/null",
-                parameters={
-                    "country": sensor["country"],
-                    "city": sensor["city"],
-                    "street": sensor["street"],
-                    "lag_feature": lag_feature["feature"],
-                }
-            )
+    # One login for the whole sensor x lag grid, the training split is materialized once per lag
+    ctx = pipeline.PipelineContext.login()
+    if direct:
+        metrics = pd.DataFrame([row for lag_feature in lag_features for row in pipeline.train_direct_models(ctx, lag_feature, model_format=model_format)])
+    elif global_model:
+        metrics = pd.DataFrame([pipeline.train_global_model(ctx, lag_feature, model_format=model_format) for lag_feature in lag_features])
+    else:
+        metrics = pipeline.run_training(ctx, sensors, lag_features, max_workers=max_workers, model_format=model_format, pack=pack)
+    print(metrics.to_string(index=False))
+    print(ctx.session.report())
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the sensor x lag feature model grid.")
+    parser.add_argument("--workers", type=int, default=None, help="Training processes (defaults to the CPU count).")
+    parser.add_argument("--format", choices=["json", "ubj"], default="json", help="Model file format, ubj is XGBoost's compact binary JSON.")
+    parser.add_argument("--pack", action="store_true", help="Also pack each lag feature's models into one indexed file.")
+    parser.add_argument("--global-model", action="store_true", help="Train one model per lag feature for all sensors, with a categorical sensor feature.")
+    parser.add_argument("--direct", action="store_true", help=f"Train one model per forecast day ({pipeline.DIRECT_HORIZONS} days) per lag feature for all sensors, forecasting without feeding predictions back.")
+    args = parser.parse_args()
+    run_training(args.workers, args.format, args.pack, args.global_model, args.direct)
 
 if __name__ == "__main__":
-    run_training()
\ No newline at end of file
+    main()
@@ -0,0 +1,188 @@
+"""
+One authenticated Hopsworks session per process.
+
+`get_session()` logs in on first use and then hands out the same project, feature store, model
+registry, dataset API and feature group / view / model handles to every caller. All remote calls go
+through `HopsworksSession.call`, which retries transient failures (connection errors, timeouts,
+HTTP 429 and 5xx) with exponential backoff and counts calls, retries and time per operation.
+With `local_store_dir` set, the project is the offline stand-in from `backend.local_store` instead.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_TRANSIENT_NAMES = {"ConnectionError", "ConnectTimeout", "ReadTimeout", "Timeout", "ChunkedEncodingError"}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Errors worth retrying: network failures and REST responses with status 429 or 5xx."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in _TRANSIENT_NAMES
+
+
+class HopsworksSession:
+    """
+    Lazily created, cached Hopsworks handles with retrying, timed remote calls. The login reads the
+    Hopsworks credentials from `env_file` when they are not in the environment yet.
+    """
+
+    def __init__(
+        self,
+        env_file: str = ".env",
+        api_key: Optional[str] = None,
+        retries: int = 4,
+        backoff_s: float = 1.0,
+        local_store_dir: Optional[Path] = None,
+    ):
+        self.env_file = env_file
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.local_store_dir = local_store_dir
+        self._lock = threading.RLock()
+        self._project = None
+        self._handles: Dict[Tuple[str, ...], Future] = {}
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "retries": 0, "seconds": 0.0})
+
+    # -- retry and timing ----------------------------------------------------
+
+    def call(self, label: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs `fn`, retrying transient errors with exponential backoff, and records it under `label`."""
+        stat = self.stats[label]
+        start = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    if attempt == self.retries or not is_transient(e):
+                        raise
+                    delay = self.backoff_s * 2 ** attempt
+                    print(f"{label} failed ({e}), retrying in {delay:.1f}s")
+                    stat["retries"] += 1
+                    time.sleep(delay)
+        finally:
+            stat["calls"] += 1
+            stat["seconds"] += time.perf_counter() - start
+
+    def report(self) -> str:
+        lines = [f"{'operation':<36} {'calls':>6} {'retries':>8} {'seconds':>9}"]
+        for label, stat in sorted(self.stats.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{label:<36} {stat['calls']:>6} {stat['retries']:>8} {stat['seconds']:>9.2f}")
+        return "\n".join(lines)
+
+    def _cached(self, key: Tuple[str, ...], label: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        # The lock only guards the table, so lookups of different handles run concurrently. The
+        # first caller of a key fetches it; later callers wait on its future instead of fetching again.
+        with self._lock:
+            future = self._handles.get(key)
+            owner = future is None
+            if owner:
+                future = self._handles[key] = Future()
+        if owner:
+            try:
+                future.set_result(self.call(label, fn, *args, **kwargs))
+            except BaseException as e:
+                # Not cached, the next caller tries again
+                with self._lock:
+                    if self._handles.get(key) is future:
+                        del self._handles[key]
+                future.set_exception(e)
+        return future.result()
+
+    # -- handles -------------------------------------------------------------
+
+    @property
+    def project(self):
+        with self._lock:
+            if self._project is None and self.local_store_dir is not None:
+                from backend import local_store
+
+                self._project = local_store.LocalProject(self.local_store_dir)
+            if self._project is None:
+                import hopsworks
+                from dotenv import load_dotenv
+
+                # HOPSWORKS_API_KEY, HOPSWORKS_PROJECT and HOPSWORKS_HOST, unless the environment already has them
+                load_dotenv(self.env_file, override=False)
+                kwargs = {"engine": "python"}
+                if self.api_key is not None:
+                    kwargs["api_key_value"] = self.api_key
+                self._project = self.call("login", hopsworks.login, **kwargs)
+            return self._project
+
+    @property
+    def feature_store(self):
+        return self._cached(("feature_store",), "get_feature_store", self.project.get_feature_store)
+
+    @property
+    def model_registry(self):
+        return self._cached(("model_registry",), "get_model_registry", self.project.get_model_registry)
+
+    @property
+    def dataset_api(self):
+        return self._cached(("dataset_api",), "get_dataset_api", self.project.get_dataset_api)
+
+    @property
+    def secrets_api(self):
+        """The project's secrets, or None for the local store, which keeps none."""
+        if self.local_store_dir is not None:
+            return None
+        import hopsworks
+
+        return self._cached(("secrets_api",), "get_secrets_api", hopsworks.get_secrets_api)
+
+    def feature_group(self, name: str, version: int = 1):
+        return self._cached(
+            ("feature_group", name, str(version)), "get_feature_group",
+            self.feature_store.get_feature_group, name=name, version=version,
+        )
+
+    def get_or_create_feature_group(self, name: str, version: int = 1, **kwargs):
+        return self._cached(
+            ("feature_group", name, str(version)), "get_or_create_feature_group",
+            self.feature_store.get_or_create_feature_group, name=name, version=version, **kwargs,
+        )
+
+    def feature_view(self, name: str, version: int = 1):
+        return self._cached(
+            ("feature_view", name, str(version)), "get_feature_view",
+            self.feature_store.get_feature_view, name=name, version=version,
+        )
+
+    def get_or_create_feature_view(self, name: str, version: int = 1, **kwargs):
+        return self._cached(
+            ("feature_view", name, str(version)), "get_or_create_feature_view",
+            self.feature_store.get_or_create_feature_view, name=name, version=version, **kwargs,
+        )
+
+    def model(self, name: str, version: int = 1):
+        return self._cached(
+            ("model", name, str(version)), "get_model",
+            self.model_registry.get_model, name=name, version=version,
+        )
+
+    def forget(self, *key: str) -> None:
+        """Drops a cached handle, e.g. after the feature group was deleted or recreated."""
+        with self._lock:
+            self._handles.pop(tuple(str(k) for k in key), None)
+
+
+_SESSION: Optional[HopsworksSession] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session(env_file: str = ".env", **kwargs) -> HopsworksSession:
+    """The process-wide session; the arguments only apply to the call that creates it."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = HopsworksSession(env_file=env_file, **kwargs)
+        return _SESSION
@@ -0,0 +1,97 @@
+"""
+Local cache of materialized train/test splits.
+
+Splits are stored under `CACHE_DIR/<view>_<version>/<key>/`. The key holds everything the split
+depends on: the view, `test_start`, how it was joined, the lag feature's definition and the data
+versions of the feature groups, so new or backfilled rows produce a new entry. Numeric columns are
+stored as float32 Parquet, the precision XGBoost trains on.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(os.getenv("AQ_SPLIT_CACHE", Path(__file__).resolve().parent / "data" / "split_cache"))
+KEY_FILE = "_key.json"
+PARTS = ("X_train", "X_test", "y_train", "y_test")
+KEEP_ENTRIES = 3
+
+Split = Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]
+
+
+def split_key(
+    name: str,
+    version: int,
+    test_start: Any,
+    data_versions: Sequence[Optional[dict]],
+    training_join: str = "feature_view",
+    feature: Optional[dict] = None,
+) -> dict:
+    """
+    `data_versions` are the mirrors' `data_version()`s of the feature groups the view reads and
+    `feature` the lag feature's spec from feature_engine (None for plain pm25).
+    """
+    return {
+        "feature_view": name,
+        "version": int(version),
+        "test_start": pd.Timestamp(test_start).isoformat(),
+        "training_join": training_join,
+        "feature": feature,
+        "data_versions": [None if v is None else {k: v.get(k) for k in sorted(v)} for v in data_versions],
+    }
+
+
+def _entry_dir(key: dict, root: Path) -> Path:
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return Path(root) / f"{key['feature_view']}_{key['version']}" / digest
+
+
+def _to_float32(df: pd.DataFrame) -> pd.DataFrame:
+    floats = [c for c in df.columns if pd.api.types.is_float_dtype(df[c]) and df[c].dtype != np.float32]
+    return df.astype({c: np.float32 for c in floats}) if floats else df
+
+
+def load(key: dict, root: Path = CACHE_DIR) -> Optional[Split]:
+    """The cached split for `key`, or None if there is none (or it was written for another key)."""
+    entry = _entry_dir(key, root)
+    try:
+        with (entry / KEY_FILE).open("r", encoding="utf-8") as fp:
+            if json.load(fp) != key:
+                return None
+        return tuple(pd.read_parquet(entry / f"{part}.parquet") for part in PARTS)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return None
+
+
+def save(key: dict, split: Split, root: Path = CACHE_DIR) -> Split:
+    """Stores the split as float32 Parquet and returns the float32 frames, so a fresh and a cached run train on the same values."""
+    split = tuple(_to_float32(df) for df in split)
+    entry = _entry_dir(key, root)
+    staging = entry.with_name(f".{entry.name}.new")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    for part, df in zip(PARTS, split):
+        df.to_parquet(staging / f"{part}.parquet", index=False)
+    with (staging / KEY_FILE).open("w", encoding="utf-8") as fp:
+        json.dump(key, fp, indent=2)
+    shutil.rmtree(entry, ignore_errors=True)
+    staging.replace(entry)
+    _prune(entry.parent)
+    return split
+
+
+def _prune(view_dir: Path, keep: int = KEEP_ENTRIES) -> None:
+    """Older entries of a view are superseded by newer data; keep the last few."""
+    entries = sorted(
+        (p for p in view_dir.iterdir() if p.is_dir() and not p.name.startswith(".")),
+        key=lambda p: p.stat().st_mtime,
+    )
+    for stale in entries[:-keep]:
+        shutil.rmtree(stale, ignore_errors=True)
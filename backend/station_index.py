@@ -0,0 +1,89 @@
+"""
+Index of the AQICN feed URLs that resolved for each sensor.
+
+Some sensors only answer on the /country/street or /country/city/street fallbacks of their
+configured `aqicn_url`. Once a fallback works it is recorded with the time it was verified, so
+later runs try it first and skip the "Unknown station" round-trips. The index is a small JSON file
+under backend/data (or `AQICN_STATION_INDEX`), a local cache that is not checked in.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+AQICN_BASE = "https://api.waqi.info/feed"
+INDEX_FILE = Path(
+    os.getenv("AQICN_STATION_INDEX", Path(__file__).resolve().parent / "data" / "resolved_stations.json")
+)
+DEFAULT_TTL_S = 7 * 24 * 60 * 60
+
+
+def sensor_key(sensor: Dict[str, Any]) -> str:
+    return f"{sensor['country']}/{sensor['city']}/{sensor['street']}"
+
+
+def load_index(file_path: Path = INDEX_FILE) -> Dict[str, Dict[str, Any]]:
+    """Read the sensor -> resolved feed URL index, or an empty one if it does not exist yet."""
+    try:
+        with Path(file_path).open("r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_index(index: Dict[str, Dict[str, Any]], file_path: Path = INDEX_FILE) -> None:
+    """Write the index atomically so a crashed run never leaves a truncated file behind."""
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as fp:
+        json.dump(index, fp, indent=2, sort_keys=True)
+    os.replace(tmp_path, file_path)
+
+
+def lookup(
+    index: Dict[str, Dict[str, Any]], sensor: Dict[str, Any], ttl: float = DEFAULT_TTL_S
+) -> Optional[str]:
+    """Return the resolved feed URL for the sensor if it was verified within `ttl` seconds."""
+    entry = index.get(sensor_key(sensor))
+    if entry and time.time() - entry["verified_at"] < ttl:
+        return entry["url"]
+    return None
+
+
+def record(index: Dict[str, Dict[str, Any]], sensor: Dict[str, Any], url: str) -> None:
+    index[sensor_key(sensor)] = {"url": url, "verified_at": time.time()}
+
+
+def forget(index: Dict[str, Dict[str, Any]], sensor: Dict[str, Any], url: str) -> None:
+    """Drop the entry for the sensor if it points at a URL that no longer resolves."""
+    key = sensor_key(sensor)
+    if index.get(key, {}).get("url") == url:
+        del index[key]
+
+
+def candidate_urls(
+    sensor: Dict[str, Any],
+    index: Optional[Dict[str, Dict[str, Any]]] = None,
+    ttl: float = DEFAULT_TTL_S,
+) -> Iterable[str]:
+    """
+    Feed URLs to try for a sensor: the cached resolution first (if fresh), then the configured
+    aqicn_url and the /country/street and /country/city/street fallbacks. Duplicates are skipped.
+    """
+    seen = set()
+    cached = lookup(index, sensor, ttl) if index is not None else None
+    candidates = [
+        cached,
+        sensor["aqicn_url"],
+        f"{AQICN_BASE}/{sensor['country']}/{sensor['street']}",
+        f"{AQICN_BASE}/{sensor['country']}/{sensor['city']}/{sensor['street']}",
+    ]
+    for url in candidates:
+        if url and url not in seen:
+            seen.add(url)
+            yield url
@@ -9,9 +9,11 @@ import requests
 from dotenv import load_dotenv
 from ruamel.yaml import YAML
 
+from backend import station_index
+
 
 SENSORS_FILE = Path(__file__).resolve().parent / "sensors" / "sensors.yml"
-AQICN_BASE = "https://api.waqi.info/feed"
+AQICN_BASE = station_index.AQICN_BASE
 AQICN_PUBLIC_BASE = "https://api.waqi.info/api/feed"
 
 
@@ -34,24 +36,30 @@ def save_sensors(file_path: Path, payload: Dict[str, Any]) -> None:
         yaml_parser.dump(payload, fp)
 
 
-def build_candidate_urls(sensor: Dict[str, Any]) -> Iterable[str]:
-    yield sensor["aqicn_url"]
-    yield f"{AQICN_BASE}/{sensor['country']}/{sensor['street']}"
-    yield f"{AQICN_BASE}/{sensor['country']}/{sensor['city']}/{sensor['street']}"
+def build_candidate_urls(
+    sensor: Dict[str, Any], index: Optional[Dict[str, Dict[str, Any]]] = None
+) -> Iterable[str]:
+    return station_index.candidate_urls(sensor, index)
 
 
 def fetch_sensor_payload(
-    sensor: Dict[str, Any], token: Optional[str]
+    sensor: Dict[str, Any],
+    token: Optional[str],
+    index: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     if token:
-        for candidate in build_candidate_urls(sensor):
+        for candidate in build_candidate_urls(sensor, index):
             url = f"{candidate}/?token={token}"
             response = requests.get(url, timeout=20)
             response.raise_for_status()
             data = response.json()
 
             if data.get("status") == "ok":
+                if index is not None and candidate != sensor["aqicn_url"]:
+                    station_index.record(index, sensor, candidate)
                 return data
+            if index is not None:
+                station_index.forget(index, sensor, candidate)
             if data.get("data") != "Unknown station":
                 raise SensorUpdateError(f"Unexpected response for {sensor['name']}: {data}")
 
@@ -152,9 +160,10 @@ def update_sensor_coordinates(
     sensors_doc = load_sensors(file_path)
     sensors: List[Dict[str, Any]] = sensors_doc.get("sensors", [])
     updates: Dict[str, Dict[str, Any]] = {}
+    index = station_index.load_index()
 
     for sensor in sensors:
-        payload = fetch_sensor_payload(sensor, token)
+        payload = fetch_sensor_payload(sensor, token, index)
         lat, lon = extract_coordinates(payload)
         sensor["latitude"] = round(lat, 6)
         sensor["longitude"] = round(lon, 6)
@@ -167,6 +176,7 @@ def update_sensor_coordinates(
         entry["lat_written"] = False
         entry["lon_written"] = False
 
+    station_index.save_index(index)
     apply_lat_lon_updates(file_path, updates)
     return sensors
 
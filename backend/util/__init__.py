@@ -0,0 +1,39 @@
+"""
+Helpers shared by the notebooks, pipelines and deployment jobs.
+
+The helpers live in small submodules (ingest, features, inference, plotting, admin) that import
+hopsworks, xgboost, matplotlib, geopy and the Open-Meteo clients only inside the functions that
+need them, so `from backend import util` costs little more than numpy and pandas. Everything is
+re-exported here so existing `util.<name>` callers keep working.
+"""
+from .features import SENSOR_FEATURE, SENSOR_KEYS, WEATHER_FEATURES, compute_lag_features, feature_history_length, sensor_ids
+from .ingest import (
+    ARCHIVE_DELAY_DAYS,
+    WEATHER_CHUNK_DIR,
+    TokenBucket,
+    backfill_historical_weather,
+    get_city_coordinates,
+    get_historical_weather,
+    get_hourly_weather_forecast,
+    get_pm25,
+    get_pm25_for_sensors,
+    make_aqicn_session,
+    trigger_request,
+)
+from .inference import (
+    PREDICTION_COLUMNS,
+    backfill_predictions_for_monitoring,
+    predict_pm25_direct,
+    predict_pm25_for_sensors,
+    predict_pm25_from_weather,
+    predict_pm25_with_single_feature,
+)
+from .plotting import PlotJob, plot_air_quality_forecast, plot_batch, plot_predictions, street_slug
+from .admin import (
+    check_file_path,
+    delete_feature_groups,
+    delete_feature_views,
+    delete_models,
+    delete_secrets,
+    purge_project,
+)
@@ -0,0 +1,47 @@
+"""Lag and rolling pm25 features. Only needs numpy and pandas."""
+import numpy as np
+import pandas as pd
+
+WEATHER_FEATURES = ['temperature_2m_mean', 'precipitation_sum', 'wind_speed_10m_max', 'wind_direction_10m_dominant']
+SENSOR_KEYS = ['country', 'city', 'street']
+# Categorical feature of the global model telling the sensors apart
+SENSOR_FEATURE = 'sensor'
+
+
+def sensor_ids(country: pd.Series, city: pd.Series, street: pd.Series) -> pd.Series:
+    """'country/city/street', the value of the sensor feature."""
+    return country.astype(str) + "/" + city.astype(str) + "/" + street.astype(str)
+
+
+def feature_history_length(feature_name: str) -> int:
+    """
+    Number of past pm25 values needed to build a lag or rolling feature, e.g. 3 for pm25_lag_3 and pm25_rolling_3d.
+    """
+    if "lag" in feature_name:
+        return int(feature_name.split("_")[-1])
+    if "rolling" in feature_name:
+        return int(feature_name.split("_")[2].replace("d", ""))
+    raise ValueError(f"Unsupported feature: {feature_name}")
+
+
+def compute_lag_features(aq_data: pd.DataFrame, country: str, city: str, street: str) -> dict:
+    
+    history = (
+        aq_data[aq_data['street'] == street]["pm25"]
+        .tail(3)
+        .tolist()
+    )
+
+    new_features = {}
+
+    for i in range(0, 3):
+        new_features[f"pm25_lag_{i+1}"] = np.float32(history[2 - i])
+
+    new_features["pm25_rolling_2d"] = np.float32(sum(history[1:]) / 2)
+    new_features["pm25_rolling_3d"] = np.float32(sum(history) / 3)
+
+    new_features["country"] = country
+    new_features["city"] = city
+    new_features["street"] = street
+
+    return new_features
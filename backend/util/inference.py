@@ -0,0 +1,282 @@
+"""Batched autoregressive and direct pm25 forecasts. The models are passed in, xgboost is never imported here."""
+from __future__ import annotations
+
+import datetime
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .features import SENSOR_FEATURE, SENSOR_KEYS, WEATHER_FEATURES, feature_history_length, sensor_ids
+
+if TYPE_CHECKING:
+    from xgboost import XGBRegressor
+
+PREDICTION_COLUMNS = ["date"] + WEATHER_FEATURES + SENSOR_KEYS + ["predicted_pm25", "days_before_forecast_day"]
+
+
+def backfill_predictions_for_monitoring(weather_fg, air_quality_df, monitor_fg, model):
+    features_df = weather_fg.read()
+    features_df = features_df.sort_values(by=['date'], ascending=True)
+    features_df = features_df.tail(10)
+    features_df['predicted_pm25'] = model.predict(features_df[['temperature_2m_mean', 'precipitation_sum', 'wind_speed_10m_max', 'wind_direction_10m_dominant']])
+    df = pd.merge(features_df, air_quality_df[['date','pm25','street','country']], on="date")
+    df['days_before_forecast_day'] = 1
+    hindcast_df = df
+    df = df.drop('pm25', axis=1)
+    monitor_fg.insert(df, write_options={"wait_for_job": True})
+    return hindcast_df
+
+
+class _ForecastInputs(NamedTuple):
+    sensor_index: pd.MultiIndex
+    history: np.ndarray        # (sensors x k) last k pm25 values, oldest first
+    weather: np.ndarray        # (cities x horizon x features)
+    weather_dates: np.ndarray  # (cities x horizon)
+    sensor_city: np.ndarray    # city row of each sensor
+    sensor_horizon: np.ndarray # forecast days of each sensor, 0 without history or weather
+
+
+def _forecast_inputs(weather_fg: pd.DataFrame, air_quality_fg: pd.DataFrame, sensors: List[dict], feature_name: str) -> _ForecastInputs:
+    k = feature_history_length(feature_name)
+    sensor_index = pd.MultiIndex.from_tuples(
+        [(s['country'], s['city'], s['street']) for s in sensors], names=SENSOR_KEYS
+    )
+    n_sensors = len(sensor_index)
+
+    # Fill the ring buffer with the last k observations per sensor, oldest first.
+    # Sensors with less than k observations keep NaN in the leading slots.
+    aq_hist = air_quality_fg[SENSOR_KEYS + ["date", "pm25"]].copy()
+    aq_hist["date"] = pd.to_datetime(aq_hist["date"]).dt.tz_localize(None)
+    aq_tail = aq_hist.sort_values("date").groupby(SENSOR_KEYS, sort=False).tail(k)
+
+    history = np.full((n_sensors, k), np.nan, dtype=np.float32)
+    rows = sensor_index.get_indexer(pd.MultiIndex.from_frame(aq_tail[SENSOR_KEYS]))
+    cols = k - 1 - aq_tail.groupby(SENSOR_KEYS, sort=False).cumcount(ascending=False).to_numpy()
+    known = rows >= 0
+    history[rows[known], cols[known]] = aq_tail["pm25"].to_numpy(dtype=np.float32)[known]
+
+    # Weather is per city: lay it out as (cities x horizon x features), sorted by date.
+    weather_all = weather_fg[["city", "date"] + WEATHER_FEATURES].copy()
+    weather_all["date"] = pd.to_datetime(weather_all["date"]).dt.tz_localize(None)
+    weather_all = weather_all.sort_values(["city", "date"], kind="stable")
+    cities = pd.Index(weather_all["city"].unique())
+    city_rows = cities.get_indexer(weather_all["city"])
+    steps = weather_all.groupby("city", sort=False).cumcount().to_numpy()
+    horizon = int(steps.max()) + 1 if len(steps) else 0
+
+    weather = np.full((len(cities), horizon, len(WEATHER_FEATURES)), np.nan, dtype=np.float32)
+    weather[city_rows, steps] = weather_all[WEATHER_FEATURES].to_numpy(dtype=np.float32)
+    weather_dates = np.full((len(cities), horizon), np.datetime64("NaT"), dtype="datetime64[ns]")
+    weather_dates[city_rows, steps] = weather_all["date"].to_numpy(dtype="datetime64[ns]")
+    city_horizon = np.bincount(city_rows, minlength=len(cities))
+
+    sensor_city = cities.get_indexer(sensor_index.get_level_values("city"))
+    # Sensors of cities without weather have no forecast days
+    sensor_horizon = np.zeros(n_sensors, dtype=np.int64)
+    has_weather = sensor_city >= 0
+    sensor_horizon[has_weather] = city_horizon[sensor_city[has_weather]]
+    no_history = np.isnan(history).all(axis=1)
+    for i in np.flatnonzero(no_history):
+        print(f"No pm25 history for {sensor_index[i]}, skipping forecast")
+    sensor_horizon[no_history] = 0
+    return _ForecastInputs(sensor_index, history, weather, weather_dates, sensor_city, sensor_horizon)
+
+
+def _model_features(model: XGBRegressor, feature_name: str, sensor_index: pd.MultiIndex, sensor_categories: Optional[Sequence[str]]):
+    """Feature order of the model, the lag and weather columns in it and the sensor category codes (or None)."""
+    feature_names = model.get_booster().feature_names or [feature_name] + WEATHER_FEATURES
+    unknown = [f for f in feature_names if f not in [feature_name, SENSOR_FEATURE] + WEATHER_FEATURES]
+    if unknown:
+        raise ValueError(f"Model expects features that cannot be forecast: {unknown}")
+    lag_col = feature_names.index(feature_name)
+    weather_cols = [feature_names.index(f) for f in WEATHER_FEATURES]
+
+    sensor_codes = None
+    if SENSOR_FEATURE in feature_names:
+        if sensor_categories is None:
+            raise ValueError("The model has a sensor feature, pass the sensor_categories it was trained with")
+        ids = sensor_ids(*(sensor_index.get_level_values(col).to_series() for col in SENSOR_KEYS))
+        sensor_codes = pd.Index(sensor_categories).get_indexer(ids)
+    return feature_names, lag_col, weather_cols, sensor_codes
+
+
+def _feature_value(ring: np.ndarray, feature_name: str) -> np.ndarray:
+    """The lag or rolling feature from (sensors x k) pm25 values, oldest first; the first non-NaN value is the oldest known."""
+    if "lag" in feature_name:
+        oldest = np.argmax(~np.isnan(ring), axis=1)
+        return ring[np.arange(len(ring)), oldest]
+    return np.nanmean(ring, axis=1)
+
+
+def _model_frame(X: np.ndarray, feature_names: List[str], sensor_codes, sensor_categories) -> pd.DataFrame:
+    frame = pd.DataFrame(X, columns=feature_names, copy=False)
+    if sensor_codes is not None:
+        frame[SENSOR_FEATURE] = pd.Categorical.from_codes(sensor_codes, categories=sensor_categories)
+    return frame
+
+
+def _prediction_frame(inputs: _ForecastInputs, out_sensor: np.ndarray, out_step: np.ndarray, out_pred: np.ndarray) -> pd.DataFrame:
+    """One row per sensor and forecast day, ordered by sensor and then by day."""
+    order = np.lexsort((out_step, out_sensor))
+    out_sensor, out_step, out_pred = out_sensor[order], out_step[order], out_pred[order]
+
+    out_city = inputs.sensor_city[out_sensor]
+    predictions = pd.DataFrame({"date": inputs.weather_dates[out_city, out_step]})
+    for j, col in enumerate(WEATHER_FEATURES):
+        predictions[col] = inputs.weather[out_city, out_step, j]
+    for col in SENSOR_KEYS:
+        predictions[col] = inputs.sensor_index.get_level_values(col)[out_sensor]
+    predictions["predicted_pm25"] = out_pred
+    predictions["days_before_forecast_day"] = out_step
+    return predictions
+
+
+def predict_pm25_for_sensors(
+    model: XGBRegressor,
+    weather_fg: pd.DataFrame,
+    air_quality_fg: pd.DataFrame,
+    sensors: List[dict],
+    feature_name: str,
+    sensor_categories: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Autoregressive pm25 forecast for all sensors at once.
+
+    Every horizon step is a single model.predict on an (N sensors x features) float32 matrix.
+    The last k pm25 values of each sensor are kept in a (N x k) ring buffer, and each prediction
+    overwrites the oldest slot, so the cost grows with the horizon and not with sensors x days.
+    Returns one row per sensor and forecast day, ordered by sensor and then by day.
+
+    A global model also has the categorical sensor feature; `sensor_categories` are the sensor ids
+    it was trained with, in order. Sensors it has not seen get a missing sensor value.
+    """
+    if "pm25" not in air_quality_fg.columns:
+        raise ValueError("Historical PM25 is required in air_quality_fg")
+    if not sensors or weather_fg.empty:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+
+    inputs = _forecast_inputs(weather_fg, air_quality_fg, sensors, feature_name)
+    if not inputs.sensor_horizon.any():
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+    history, k = inputs.history, inputs.history.shape[1]
+    feature_names, lag_col, weather_cols, sensor_codes = _model_features(model, feature_name, inputs.sensor_index, sensor_categories)
+
+    X = np.empty((len(inputs.sensor_index), len(feature_names)), dtype=np.float32)
+    head = 0
+    out_sensor, out_step, out_pred = [], [], []
+
+    for step in range(inputs.weather.shape[1]):
+        active = np.flatnonzero(inputs.sensor_horizon > step)
+        if len(active) == 0:
+            break
+
+        # Ring order starting at the oldest slot
+        ring = history[active][:, (head + np.arange(k)) % k]
+
+        X_step = X[:len(active)]
+        X_step[:, lag_col] = _feature_value(ring, feature_name)
+        X_step[:, weather_cols] = inputs.weather[inputs.sensor_city[active], step]
+
+        codes = None if sensor_codes is None else sensor_codes[active]
+        pm25_pred = model.predict(_model_frame(X_step, feature_names, codes, sensor_categories))
+
+        history[active, head] = pm25_pred
+        head = (head + 1) % k
+
+        out_sensor.append(active)
+        out_step.append(np.full(len(active), step))
+        out_pred.append(pm25_pred.astype(np.float32))
+
+    if not out_sensor:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+    return _prediction_frame(inputs, np.concatenate(out_sensor), np.concatenate(out_step), np.concatenate(out_pred))
+
+
+def predict_pm25_direct(
+    models: Sequence[XGBRegressor],
+    weather_fg: pd.DataFrame,
+    air_quality_fg: pd.DataFrame,
+    sensors: List[dict],
+    feature_name: str,
+    sensor_categories: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Direct pm25 forecast for all sensors and days at once, with one model per forecast day.
+
+    `models[h]` predicts day h of the forecast from the lag feature as known today and the weather
+    of day h, so no prediction is fed back and the forecast is as long as the shorter of the weather
+    and `models`. The (sensors x days) feature matrix is built in one pass and each model scores its
+    rows of it, one predict per day. A single multi-output booster would score everything at once,
+    but it needs one feature row for all of its targets, while each day here has its own weather.
+    Returns the same rows and columns as predict_pm25_for_sensors.
+    """
+    if "pm25" not in air_quality_fg.columns:
+        raise ValueError("Historical PM25 is required in air_quality_fg")
+    if not sensors or not models or weather_fg.empty:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+
+    inputs = _forecast_inputs(weather_fg, air_quality_fg, sensors, feature_name)
+    if not inputs.sensor_horizon.any():
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+    feature_names, lag_col, weather_cols, sensor_codes = _model_features(models[0], feature_name, inputs.sensor_index, sensor_categories)
+
+    days = min(inputs.weather.shape[1], len(models))
+    out_sensor, out_step = np.nonzero(inputs.sensor_horizon[:, None] > np.arange(days))
+    if len(out_sensor) == 0:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+
+    X = np.empty((len(out_sensor), len(feature_names)), dtype=np.float32)
+    X[:, lag_col] = _feature_value(inputs.history, feature_name)[out_sensor]
+    X[:, weather_cols] = inputs.weather[inputs.sensor_city[out_sensor], out_step]
+    codes = None if sensor_codes is None else sensor_codes[out_sensor]
+    X_frame = _model_frame(X, feature_names, codes, sensor_categories)
+
+    out_pred = np.empty(len(out_sensor), dtype=np.float32)
+    for step in range(days):
+        rows = np.flatnonzero(out_step == step)
+        if len(rows):
+            out_pred[rows] = models[step].predict(X_frame.iloc[rows])
+    return _prediction_frame(inputs, out_sensor, out_step, out_pred)
+
+
+def predict_pm25_from_weather(model: XGBRegressor, weather_fg: pd.DataFrame, sensors: List[dict]) -> pd.DataFrame:
+    """
+    Forecast of a model trained on the weather features only (the "no_lag" option of lags.yml).
+
+    Without a lag there is nothing to roll forward: every sensor gets the weather rows of its city
+    and all of them are scored in one model.predict. Returns the same rows and columns as
+    predict_pm25_for_sensors.
+    """
+    if not sensors or weather_fg.empty:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+    weather_all = weather_fg[["city", "date"] + WEATHER_FEATURES].copy()
+    weather_all["date"] = pd.to_datetime(weather_all["date"]).dt.tz_localize(None)
+    weather_all = weather_all.sort_values(["city", "date"], kind="stable")
+    weather_all["days_before_forecast_day"] = weather_all.groupby("city", sort=False).cumcount()
+
+    predictions = pd.DataFrame(sensors)[SENSOR_KEYS].merge(weather_all, on="city")
+    if predictions.empty:
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
+    feature_names = model.get_booster().feature_names or WEATHER_FEATURES
+    X = predictions[feature_names].astype(np.float32)
+    predictions["predicted_pm25"] = model.predict(X).astype(np.float32)
+    return predictions[PREDICTION_COLUMNS]
+
+
+def predict_pm25_with_single_feature(
+    model: XGBRegressor,
+    weather_fg: pd.DataFrame,
+    air_quality_fg: pd.DataFrame,
+    country: str,
+    city: str,
+    street: str,
+    today: datetime,
+    feature_name: str,
+) -> list:
+    """
+    Single-sensor forecast, kept for callers that still loop over sensors. Prefer predict_pm25_for_sensors.
+    """
+    sensor = {"country": country, "city": city, "street": street}
+    predictions = predict_pm25_for_sensors(model, weather_fg, air_quality_fg, [sensor], feature_name)
+    return predictions.to_dict("records")
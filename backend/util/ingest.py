@@ -0,0 +1,368 @@
+"""
+Data collection: Open-Meteo weather (batched and chunked backfills), city geocoding and AQICN pm25.
+HTTP and geocoding clients are imported inside the functions that use them.
+"""
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+import pandas as pd
+
+from .features import WEATHER_FEATURES
+
+from backend import station_index
+
+if TYPE_CHECKING:
+    import requests
+
+def _as_list(value) -> list:
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series)):
+        return list(value)
+    return [value]
+
+def _weather_responses_to_frame(responses, block: str, columns: List[str], city, street) -> pd.DataFrame:
+    """
+    Decodes every Open-Meteo response (one per requested location) into one long frame.
+    `city` and `street` are scalars or lists with one entry per location; a street column is
+    only added when streets are given.
+    """
+    cities = _as_list(city)
+    streets = _as_list(street)
+    if len(cities) == 1:
+        cities = cities * len(responses)
+    if len(streets) == 1:
+        streets = streets * len(responses)
+
+    frames = []
+    for response, location_city, location_street in zip(responses, cities, streets):
+        print(f"Coordinates {response.Latitude()}°N {response.Longitude()}°E, elevation {response.Elevation()} m asl")
+
+        # The order of variables needs to be the same as requested.
+        values = response.Daily() if block == "daily" else response.Hourly()
+        data = {"date": pd.date_range(
+            start = pd.to_datetime(values.Time(), unit = "s"),
+            end = pd.to_datetime(values.TimeEnd(), unit = "s"),
+            freq = pd.Timedelta(seconds = values.Interval()),
+            inclusive = "left"
+        )}
+        for i, column in enumerate(columns):
+            data[column] = values.Variables(i).ValuesAsNumpy()
+
+        frame = pd.DataFrame(data = data).dropna()
+        if location_city is not None:
+            frame['city'] = location_city
+        if location_street is not None:
+            frame['street'] = location_street
+        frames.append(frame)
+
+    print(f"Timezone {responses[0].Timezone()} {responses[0].TimezoneAbbreviation()}")
+    print(f"Timezone difference to GMT+0 {responses[0].UtcOffsetSeconds()} s")
+    return pd.concat(frames, ignore_index=True)
+
+def get_historical_weather(city, start_date,  end_date, latitude, longitude, street=None):
+    """
+    Daily historical weather. latitude/longitude (and optionally city/street) may be lists to fetch
+    many sensor locations in one request; the result is then one long frame keyed by street.
+    """
+    # latitude, longitude = get_city_coordinates(city)
+
+    import openmeteo_requests
+    import requests_cache
+    from retry_requests import retry
+
+    # Setup the Open-Meteo API client with cache and retry on error
+    cache_session = requests_cache.CachedSession('.cache', expire_after = -1)
+    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
+    openmeteo = openmeteo_requests.Client(session = retry_session)
+
+    # Make sure all required weather variables are listed here
+    # The order of variables in hourly or daily is important to assign them correctly below
+    url = "https://archive-api.open-meteo.com/v1/archive"
+    params = {
+        "latitude": _as_list(latitude),
+        "longitude": _as_list(longitude),
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": ["temperature_2m_mean", "precipitation_sum", "wind_speed_10m_max", "wind_direction_10m_dominant"]
+    }
+    responses = openmeteo.weather_api(url, params=params)
+
+    return _weather_responses_to_frame(responses, "daily", WEATHER_FEATURES, city, street)
+
+def get_hourly_weather_forecast(city, latitude, longitude, street=None):
+    """
+    Hourly weather forecast. latitude/longitude (and optionally street) may be lists to fetch
+    many sensor locations in one request; the result is then one long frame keyed by street.
+    `city` fills the city column, a scalar for all locations or one entry per location.
+    """
+
+    import openmeteo_requests
+    import requests_cache
+    from retry_requests import retry
+
+    # Setup the Open-Meteo API client with cache and retry on error
+    cache_session = requests_cache.CachedSession('.cache', expire_after = 3600)
+    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
+    openmeteo = openmeteo_requests.Client(session = retry_session)
+
+    # Make sure all required weather variables are listed here
+    # The order of variables in hourly or daily is important to assign them correctly below
+    url = "https://api.open-meteo.com/v1/ecmwf"
+    params = {
+        "latitude": _as_list(latitude),
+        "longitude": _as_list(longitude),
+        "hourly": ["temperature_2m", "precipitation", "wind_speed_10m", "wind_direction_10m"]
+    }
+    responses = openmeteo.weather_api(url, params=params)
+
+    # Hourly values are stored under the daily feature names used in the weather feature group
+    return _weather_responses_to_frame(responses, "hourly", WEATHER_FEATURES, city, street)
+
+
+WEATHER_CHUNK_DIR = Path(__file__).resolve().parent.parent / "data" / "weather_chunks"
+# The archive API lags a few days behind, so chunks ending this recently are re-fetched on every run
+ARCHIVE_DELAY_DAYS = 7
+
+def backfill_historical_weather(
+    city,
+    start_date,
+    end_date,
+    latitude,
+    longitude,
+    street=None,
+    chunk: str = "M",
+    cache_dir: Path = WEATHER_CHUNK_DIR,
+    max_workers: int = 4,
+) -> pd.DataFrame:
+    """
+    Resumable version of get_historical_weather for long backfills.
+
+    The range is split into calendar chunks (chunk="M" for months, "Y" for years). Every closed
+    chunk is stored as a Parquet file under cache_dir, and later runs read it back instead of
+    downloading it again. Only missing chunks and still-open ones (ending within
+    ARCHIVE_DELAY_DAYS of today) are fetched, in parallel. Returns the same frame as
+    get_historical_weather for [start_date, end_date].
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    settled = pd.Timestamp(datetime.date.today()) - pd.Timedelta(days=ARCHIVE_DELAY_DAYS)
+
+    # Chunks are keyed by the requested locations so different sensors never share files
+    location_key = json.dumps([_as_list(city), _as_list(latitude), _as_list(longitude), _as_list(street)], default=str)
+    location_dir = Path(cache_dir) / hashlib.sha1(location_key.encode("utf-8")).hexdigest()[:12]
+    location_dir.mkdir(parents=True, exist_ok=True)
+
+    cached, missing = [], []
+    for period in pd.period_range(start, end, freq=chunk):
+        chunk_start = period.start_time.normalize()
+        chunk_end = period.end_time.normalize()
+        chunk_file = location_dir / f"{period}.parquet"
+        closed = chunk_end <= settled
+        if closed and chunk_file.exists():
+            cached.append(chunk_file)
+        elif closed:
+            # A closed chunk is stored, so it is always fetched whole and trimmed to the range below
+            missing.append((chunk_start, chunk_end, chunk_file, True))
+        else:
+            missing.append((chunk_start, min(chunk_end, end), chunk_file, False))
+
+    def _fetch(chunk_start, chunk_end, chunk_file, closed):
+        frame = get_historical_weather(
+            city, chunk_start.strftime('%Y-%m-%d'), chunk_end.strftime('%Y-%m-%d'), latitude, longitude, street
+        )
+        if closed:
+            frame.to_parquet(chunk_file, index=False)
+        return frame
+
+    print(f"Weather backfill: {len(cached)} chunks cached, {len(missing)} to fetch")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        fetched = list(pool.map(lambda args: _fetch(*args), missing))
+
+    frames = [pd.read_parquet(chunk_file) for chunk_file in cached] + fetched
+    weather_df = pd.concat(frames, ignore_index=True)
+    weather_df = weather_df[(weather_df['date'] >= start) & (weather_df['date'] <= end)]
+    sort_cols = ['street', 'date'] if 'street' in weather_df.columns else ['date']
+    return weather_df.sort_values(sort_cols).reset_index(drop=True)
+
+
+def get_city_coordinates(city_name: str):
+    """
+    Takes city name and returns its latitude and longitude (rounded to 2 digits after dot).
+    """
+    from geopy.geocoders import Nominatim
+
+    # Initialize Nominatim API (for getting lat and long of the city)
+    geolocator = Nominatim(user_agent="MyApp")
+    city = geolocator.geocode(city_name)
+
+    latitude = round(city.latitude, 2)
+    longitude = round(city.longitude, 2)
+
+    return latitude, longitude
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting requests to `rate` per second, with bursts of up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def make_aqicn_session(max_connections: int = 8) -> requests.Session:
+    """
+    Keep-alive session for the AQICN API. At most `max_connections` connections are open to
+    the host at once; extra requests block until a pooled connection is free.
+    """
+    import requests
+    import requests.adapters
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=max_connections,
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def trigger_request(url:str, session: requests.Session = None, timeout: float = None, rate_limiter: TokenBucket = None):
+    import requests
+
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    if session is not None:
+        response = session.get(url, timeout=timeout)
+    else:
+        response = requests.get(url, timeout=timeout)
+    if response.status_code == 200:
+        # Extract the JSON content from the response
+        data = response.json()
+    else:
+        print("Failed to retrieve data. Status Code:", response.status_code)
+        raise requests.exceptions.RequestException(response.status_code)
+
+    return data
+
+
+def get_pm25(
+    aqicn_url: str,
+    country: str,
+    city: str,
+    street: str,
+    day: datetime.date,
+    AQI_API_KEY: str,
+    session: requests.Session = None,
+    timeout: float = None,
+    rate_limiter: TokenBucket = None,
+    resolved_stations: dict = None,
+):
+    """
+    Returns DataFrame with air quality (pm25) as dataframe
+
+    Feed URLs that only resolve through the /country/street fallbacks are remembered in the
+    station index, so later runs go straight to the working URL. Pass `resolved_stations` to share
+    one loaded index between calls; the caller is then responsible for saving it.
+    """
+    import requests
+
+    sensor = {"aqicn_url": aqicn_url, "country": country, "city": city, "street": street}
+    index = station_index.load_index() if resolved_stations is None else resolved_stations
+
+    # Try the cached URL first, then the configured URL, then retry with country/city in the url
+    for candidate in station_index.candidate_urls(sensor, index):
+        url = f"{candidate}/?token={AQI_API_KEY}"
+        data = trigger_request(url, session, timeout, rate_limiter)
+        if data['data'] != "Unknown station":
+            break
+        station_index.forget(index, sensor, candidate)
+
+    if data['status'] == 'ok' and candidate != aqicn_url:
+        station_index.record(index, sensor, candidate)
+    if resolved_stations is None:
+        station_index.save_index(index)
+
+    # Check if the API response contains the data
+    if data['status'] == 'ok':
+        # Extract the air quality data
+        aqi_data = data['data']
+        aq_today_df = {}
+        aq_today_df['pm25'] = aqi_data['iaqi'].get('pm25', {}).get('v', None)
+        aq_today_df['pm25'] = float(aq_today_df['pm25'])
+
+        aq_today_df['country'] = country
+        aq_today_df['city'] = city
+        aq_today_df['street'] = street
+        aq_today_df['date'] = day
+        aq_today_df['date'] = pd.to_datetime(aq_today_df['date'])
+        aq_today_df['url'] = aqicn_url
+    else:
+        print("Error: There may be an incorrect  URL for your Sensor or it is not contactable right now. The API response does not contain data.  Error message:", data['data'])
+        raise requests.exceptions.RequestException(data['data'])
+
+    return aq_today_df
+
+def get_pm25_for_sensors(
+    sensors: List[dict],
+    day: datetime.date,
+    AQI_API_KEY: str,
+    max_workers: int = 8,
+    requests_per_second: float = 10.0,
+    timeout: float = 20,
+) -> pd.DataFrame:
+    """
+    Fetches today's pm25 for all sensors concurrently and returns one DataFrame, in the order of `sensors`.
+    Requests share one keep-alive session and a token bucket, so the whole fleet takes about one
+    round-trip instead of one per sensor while staying under the AQICN rate limit.
+    """
+    session = make_aqicn_session(max_workers)
+    rate_limiter = TokenBucket(requests_per_second, capacity=max_workers)
+    resolved_stations = station_index.load_index()
+
+    # Save resolutions found so far even if one sensor fails
+    try:
+        with session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(
+                    get_pm25,
+                    sensor['aqicn_url'],
+                    sensor['country'],
+                    sensor['city'],
+                    sensor['street'],
+                    day,
+                    AQI_API_KEY,
+                    session=session,
+                    timeout=timeout,
+                    rate_limiter=rate_limiter,
+                    resolved_stations=resolved_stations,
+                )
+                for sensor in sensors
+            ]
+            rows = [future.result() for future in futures]
+    finally:
+        station_index.save_index(resolved_stations)
+
+    return pd.DataFrame(rows)
@@ -0,0 +1,201 @@
+"""
+Forecast and hindcast plots. matplotlib is imported on the first plot.
+
+`plot_predictions` renders the images of many sensors at once: the jobs run on a process pool with
+the Agg backend, every worker draws into one reused figure, and an image is skipped when the hash
+of the data it shows matches the one recorded when it was last written.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+HASH_FILE = ".plot_hashes.json"
+
+_figure = None
+
+
+class PlotJob(NamedTuple):
+    city: str
+    street: str
+    df: pd.DataFrame
+    file_path: str
+    hindcast: bool = False
+
+
+def street_slug(street: str) -> str:
+    """File and model name friendly street, as used for the model directories and image names."""
+    street_new = street.replace('-', '_')
+    street_new = street_new.replace('ä', 'ae')
+    street_new = street_new.replace('ö', 'oe')
+    street_new = street_new.replace('å', 'oa')
+    return street_new
+
+
+def _draw(fig, city: str, street: str, df: pd.DataFrame, hindcast: bool) -> None:
+    from matplotlib.patches import Patch
+    from matplotlib.ticker import MultipleLocator, ScalarFormatter
+
+    ax = fig.add_subplot()
+
+    day = pd.to_datetime(df['date']).dt.date
+    # Plot each column separately in matplotlib
+    ax.plot(day, df['predicted_pm25'], label='Predicted PM2.5', color='red', linewidth=2, marker='o', markersize=5, markerfacecolor='blue')
+
+    # Set the y-axis to a logarithmic scale
+    ax.set_yscale('log')
+    ax.set_yticks([0, 10, 25, 50, 100, 250, 500])
+    ax.get_yaxis().set_major_formatter(ScalarFormatter())
+    ax.set_ylim(bottom=1)
+
+    # Set the labels and title
+    ax.set_xlabel('Date')
+    ax.set_title(f"PM2.5 Predicted (Logarithmic Scale) for {city}, {street}")
+    ax.set_ylabel('PM2.5')
+
+    colors = ['green', 'yellow', 'orange', 'red', 'purple', 'darkred']
+    labels = ['Good', 'Moderate', 'Unhealthy for Some', 'Unhealthy', 'Very Unhealthy', 'Hazardous']
+    ranges = [(0, 49), (50, 99), (100, 149), (150, 199), (200, 299), (300, 500)]
+    for color, (start, end) in zip(colors, ranges):
+        ax.axhspan(start, end, color=color, alpha=0.3)
+
+    # Add a legend for the different Air Quality Categories
+    patches = [Patch(color=colors[i], label=f"{labels[i]}: {ranges[i][0]}-{ranges[i][1]}") for i in range(len(colors))]
+    legend1 = ax.legend(handles=patches, loc='upper right', title="Air Quality Categories", fontsize='x-small')
+
+    # Aim for ~10 annotated values on x-axis, will work for both forecasts ans hindcasts
+    if len(df.index) > 11:
+        every_x_tick = len(df.index) / 10
+        ax.xaxis.set_major_locator(MultipleLocator(every_x_tick))
+
+    ax.tick_params(axis='x', labelrotation=45)
+
+    if hindcast == True:
+        ax.plot(day, df['pm25'], label='Actual PM2.5', color='black', linewidth=2, marker='^', markersize=5, markerfacecolor='grey')
+        ax.legend(loc='upper left', fontsize='x-small')
+        ax.add_artist(legend1)
+
+    # Ensure everything is laid out neatly
+    fig.tight_layout()
+
+
+def plot_air_quality_forecast(city: str, street: str, df: pd.DataFrame, file_path: str, hindcast=False):
+    """Saves one forecast (or hindcast) image and returns its Figure, which notebooks can display."""
+    from matplotlib.figure import Figure
+
+    # A bare Figure is not registered with pyplot, so it is freed once the caller drops it
+    fig = Figure(figsize=(10, 6))
+    _draw(fig, city, street, df, hindcast)
+
+    # # Save the figure, overwriting any existing file with the same name
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    fig.savefig(file_path)
+    return fig
+
+
+def _render(job: PlotJob) -> str:
+    """Draws one job into the worker's figure, which is cleared instead of recreated for the next job."""
+    global _figure
+    if _figure is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+
+        # A bare Figure is not registered with pyplot, so nothing keeps old plots alive
+        _figure = Figure(figsize=(10, 6))
+    try:
+        _draw(_figure, job.city, job.street, job.df, job.hindcast)
+        os.makedirs(os.path.dirname(job.file_path), exist_ok=True)
+        _figure.savefig(job.file_path)
+    finally:
+        _figure.clear()
+    return job.file_path
+
+
+def data_hash(job: PlotJob) -> str:
+    """Hash of everything an image shows: the plotted columns, the title and the plot kind."""
+    columns = ['date', 'predicted_pm25'] + (['pm25'] if job.hindcast else [])
+    digest = hashlib.sha256(f"{job.city}|{job.street}|{job.hindcast}".encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(job.df[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _read_hashes(directory: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(directory, HASH_FILE), "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_hashes(directory: str, hashes: Dict[str, str]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, HASH_FILE), "w", encoding="utf-8") as fp:
+        json.dump(hashes, fp, indent=2, sort_keys=True)
+
+
+def plot_batch(jobs: List[PlotJob], max_workers: Optional[int] = None) -> List[str]:
+    """
+    Renders all jobs and returns their file paths. Jobs whose image exists and was written from the
+    same data are skipped. max_workers=1 renders in this process, otherwise a spawned process pool
+    of up to one worker per CPU is used.
+    """
+    hashes = {}
+    todo = []
+    for job in jobs:
+        directory, name = os.path.split(job.file_path)
+        known = hashes.setdefault(directory, _read_hashes(directory))
+        digest = data_hash(job)
+        if known.get(name) == digest and os.path.exists(job.file_path):
+            continue
+        known[name] = digest
+        todo.append(job)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(todo), 1))
+    if max_workers == 1:
+        for job in todo:
+            _render(job)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_render, todo))
+    print(f"Rendered {len(todo)} plots, {len(jobs) - len(todo)} unchanged")
+
+    # Only recorded once every image is written, so a failed run redraws on the next one
+    for directory, known in hashes.items():
+        _write_hashes(directory, known)
+    return [job.file_path for job in jobs]
+
+
+def plot_predictions(
+    predictions: pd.DataFrame,
+    sensors: List[dict],
+    out_dir: str,
+    stamp: str,
+    hindcast: bool = False,
+    max_workers: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Forecast (or, with hindcast=True, hindcast) images of every sensor in `predictions`, which holds
+    the rows of all sensors with a street column. Images are named
+    pm25_{forecast|hindcast}_{street}_{stamp}.png. Returns the file path per street; sensors without
+    rows get no image.
+    """
+    kind = "hindcast" if hindcast else "forecast"
+    by_street = dict(tuple(predictions.sort_values(by=['date']).groupby('street', sort=False)))
+    jobs = [
+        PlotJob(
+            sensor['city'],
+            sensor['street'],
+            by_street[sensor['street']],
+            os.path.join(out_dir, f"pm25_{kind}_{street_slug(sensor['street'])}_{stamp}.png"),
+            hindcast,
+        )
+        for sensor in sensors
+        if sensor['street'] in by_street
+    ]
+    plot_batch(jobs, max_workers)
+    return {job.street: job.file_path for job in jobs}
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import asof_join
+from backend.util import WEATHER_FEATURES
+
+
+def _frames(seed=0):
+    rng = np.random.default_rng(seed)
+    left = pd.DataFrame({
+        "city": rng.choice(["stockholm", "uppsala", "lund"], 300),
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 60, 300), unit="D"),
+        "pm25": rng.uniform(1, 50, 300),
+    })
+    # No weather for lund, and days missing for the others
+    right = pd.DataFrame({
+        "city": rng.choice(["stockholm", "uppsala"], 80),
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(-5, 60, 80), unit="D"),
+        "temperature_2m_mean": rng.normal(5, 3, 80),
+    }).drop_duplicates(["city", "date"])
+    return left, right
+
+
+def _reference(left, right, tolerance=None):
+    merged = pd.merge_asof(
+        left.reset_index().sort_values("date"), right.sort_values("date"),
+        on="date", by="city", direction="backward", tolerance=tolerance,
+    )
+    return merged.set_index("index").sort_index()
+
+
+@pytest.mark.parametrize("tolerance", [None, pd.Timedelta(days=3)])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_asof_join_matches_merge_asof(seed, tolerance):
+    left, right = _frames(seed)
+    joined = asof_join.asof_join(left, right, ["city"], tolerance=tolerance)
+
+    assert joined.index.equals(left.index)
+    expected = _reference(left, right, tolerance)
+    np.testing.assert_array_equal(joined["temperature_2m_mean"].to_numpy(), expected["temperature_2m_mean"].to_numpy())
+
+
+def test_training_matrix_columns_and_split():
+    left, right = _frames()
+    air_quality = left.assign(country="sweden", street=lambda df: df["city"] + "gatan", pm25_lag_1=1.0)
+    air_quality = air_quality.drop_duplicates(["street", "date"])
+    weather = right.assign(**{f: 0.0 for f in WEATHER_FEATURES[1:]})
+
+    matrix = asof_join.training_matrix(air_quality, weather, "pm25_lag_1")
+    assert matrix.columns.tolist() == (
+        ["pm25", "pm25_lag_1", "date"] + WEATHER_FEATURES
+        + ["air_quality_with_all_lags_1_country", "air_quality_with_all_lags_1_city", "air_quality_with_all_lags_1_street", "weather_1_city"]
+    )
+    X_train, X_test, y_train, y_test = asof_join.split_by_date(matrix, "2025-02-01")
+    assert len(X_train) + len(X_test) == len(matrix)
+    assert (X_train["date"] < "2025-02-01").all() and (X_test["date"] >= "2025-02-01").all()
+    assert y_train.columns.tolist() == ["pm25"]
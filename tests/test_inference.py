@@ -0,0 +1,174 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.util import WEATHER_FEATURES, inference
+
+
+class LinearModel:
+    """Stands in for an XGBRegressor: a fixed linear function of the features, in float32."""
+
+    def __init__(self, feature_names, seed=0):
+        self.feature_names = feature_names
+        self.weights = np.random.default_rng(seed).uniform(0.2, 0.8, len(feature_names)).astype(np.float32)
+
+    def get_booster(self):
+        return self
+
+    def predict(self, X):
+        return (X[self.feature_names].to_numpy(dtype=np.float32) @ self.weights).astype(np.float32)
+
+
+SENSORS = [
+    {"country": "sweden", "city": "stockholm", "street": "hammarby"},
+    {"country": "sweden", "city": "stockholm", "street": "hornsgatan"},
+    {"country": "sweden", "city": "uppsala", "street": "kungsgatan"},
+]
+
+
+def _history(days=10, seed=1):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-06-01", periods=days)
+    frames = [
+        pd.DataFrame({**sensor, "date": dates, "pm25": rng.uniform(2, 40, days).astype(np.float32)})
+        for sensor in SENSORS
+    ]
+    # Shuffled, the forecast must not depend on the row order
+    return pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0)
+
+
+def _weather(days=7, seed=2):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-06-11", periods=days)
+    frames = [
+        pd.DataFrame({"city": city, "date": dates, **{f: rng.uniform(0, 10, days) for f in WEATHER_FEATURES}})
+        for city in ("stockholm", "uppsala")
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _reference(model, weather_fg, air_quality_fg, sensor, feature_name):
+    """The per-sensor loop the batched forecast replaced."""
+    k = inference.feature_history_length(feature_name)
+    aq_loc = air_quality_fg[air_quality_fg["street"] == sensor["street"]].sort_values("date")
+    history = aq_loc["pm25"].tail(k).tolist()
+    weather_future = weather_fg[weather_fg["city"] == sensor["city"]].sort_values("date").reset_index(drop=True)
+
+    predictions = []
+    for i, row in weather_future.iterrows():
+        feature_value = history[0] if "lag" in feature_name else sum(history) / len(history)
+        X_df = pd.DataFrame([{feature_name: feature_value, **{f: np.float32(row[f]) for f in WEATHER_FEATURES}}])
+        pm25_pred = model.predict(X_df)[0]
+        predictions.append({"date": row["date"], **sensor, "predicted_pm25": pm25_pred, "days_before_forecast_day": i})
+        history.append(pm25_pred)
+        if len(history) > k:
+            history.pop(0)
+    return pd.DataFrame(predictions)
+
+
+@pytest.mark.parametrize("feature_name", ["pm25_lag_1", "pm25_lag_3", "pm25_rolling_2d", "pm25_rolling_3d"])
+def test_batched_forecast_matches_per_sensor_loop(feature_name):
+    model = LinearModel([feature_name] + WEATHER_FEATURES)
+    aq, weather = _history(), _weather()
+
+    batched = inference.predict_pm25_for_sensors(model, weather, aq, SENSORS, feature_name)
+    expected = pd.concat([_reference(model, weather, aq, sensor, feature_name) for sensor in SENSORS], ignore_index=True)
+
+    assert len(batched) == len(SENSORS) * 7
+    for column in ["date", "country", "city", "street", "days_before_forecast_day"]:
+        assert batched[column].tolist() == expected[column].tolist()
+    np.testing.assert_allclose(batched["predicted_pm25"], expected["predicted_pm25"], rtol=1e-5)
+
+
+def test_short_history_starts_from_the_oldest_known_value():
+    model = LinearModel(["pm25_lag_3"] + WEATHER_FEATURES)
+    aq, weather = _history(days=2), _weather()
+
+    batched = inference.predict_pm25_for_sensors(model, weather, aq, SENSORS, "pm25_lag_3")
+    expected = pd.concat([_reference(model, weather, aq, sensor, "pm25_lag_3") for sensor in SENSORS], ignore_index=True)
+    np.testing.assert_allclose(batched["predicted_pm25"], expected["predicted_pm25"], rtol=1e-5)
+
+
+def test_empty_weather_gives_no_forecast():
+    model = LinearModel(["pm25_lag_1"] + WEATHER_FEATURES)
+    weather = _weather().iloc[:0]
+
+    predictions = inference.predict_pm25_for_sensors(model, weather, _history(), SENSORS, "pm25_lag_1")
+    assert predictions.empty
+    assert predictions.columns.tolist() == inference.PREDICTION_COLUMNS
+
+    sensor = SENSORS[0]
+    assert inference.predict_pm25_with_single_feature(
+        model, weather, _history(), sensor["country"], sensor["city"], sensor["street"], datetime.datetime(2025, 6, 11), "pm25_lag_1"
+    ) == []
+
+
+def test_sensors_without_weather_for_their_city_are_skipped():
+    model = LinearModel(["pm25_lag_1"] + WEATHER_FEATURES)
+    weather = _weather()
+    weather = weather[weather["city"] == "uppsala"]
+
+    predictions = inference.predict_pm25_for_sensors(model, weather, _history(), SENSORS, "pm25_lag_1")
+    assert set(predictions["street"]) == {"kungsgatan"}
+
+    none_match = inference.predict_pm25_for_sensors(model, weather, _history(), SENSORS[:2], "pm25_lag_1")
+    assert none_match.empty
+
+
+def _direct_reference(models, weather_fg, air_quality_fg, sensor, feature_name):
+    """Every day predicted on its own from the history known before the forecast starts."""
+    k = inference.feature_history_length(feature_name)
+    history = air_quality_fg[air_quality_fg["street"] == sensor["street"]].sort_values("date")["pm25"].tail(k).tolist()
+    feature_value = history[0] if "lag" in feature_name else sum(history) / len(history)
+    weather_future = weather_fg[weather_fg["city"] == sensor["city"]].sort_values("date").reset_index(drop=True)
+
+    predictions = []
+    for day, row in weather_future.head(len(models)).iterrows():
+        X_df = pd.DataFrame([{feature_name: feature_value, **{f: np.float32(row[f]) for f in WEATHER_FEATURES}}])
+        predictions.append({"date": row["date"], **sensor, "predicted_pm25": models[day].predict(X_df)[0], "days_before_forecast_day": day})
+    return pd.DataFrame(predictions)
+
+
+@pytest.mark.parametrize("feature_name", ["pm25_lag_1", "pm25_lag_3", "pm25_rolling_3d"])
+def test_direct_forecast_scores_each_day_with_its_model(feature_name):
+    models = [LinearModel([feature_name] + WEATHER_FEATURES, seed=day) for day in range(5)]
+    aq, weather = _history(), _weather(days=7)
+
+    direct = inference.predict_pm25_direct(models, weather, aq, SENSORS, feature_name)
+    expected = pd.concat([_direct_reference(models, weather, aq, sensor, feature_name) for sensor in SENSORS], ignore_index=True)
+
+    # Five models, so the forecast stops after five of the seven weather days
+    assert len(direct) == len(SENSORS) * 5
+    assert direct.columns.tolist() == inference.PREDICTION_COLUMNS
+    for column in ["date", "country", "city", "street", "days_before_forecast_day"]:
+        assert direct[column].tolist() == expected[column].tolist()
+    np.testing.assert_allclose(direct["predicted_pm25"], expected["predicted_pm25"], rtol=1e-5)
+
+    # The first day is the same forecast as the autoregressive one with that model
+    first_day = inference.predict_pm25_for_sensors(models[0], weather, aq, SENSORS, feature_name)
+    first_day = first_day[first_day["days_before_forecast_day"] == 0].reset_index(drop=True)
+    np.testing.assert_allclose(direct[direct["days_before_forecast_day"] == 0]["predicted_pm25"], first_day["predicted_pm25"], rtol=1e-6)
+
+
+def test_direct_forecast_without_weather_or_models_is_empty():
+    models = [LinearModel(["pm25_lag_1"] + WEATHER_FEATURES)]
+    assert inference.predict_pm25_direct(models, _weather().iloc[:0], _history(), SENSORS, "pm25_lag_1").empty
+    assert inference.predict_pm25_direct([], _weather(), _history(), SENSORS, "pm25_lag_1").empty
+
+
+def test_weather_only_forecast_scores_each_sensor_with_its_city_weather():
+    model = LinearModel(WEATHER_FEATURES)
+    weather = _weather()
+
+    predictions = inference.predict_pm25_from_weather(model, weather, SENSORS)
+
+    assert list(predictions.columns) == inference.PREDICTION_COLUMNS
+    assert len(predictions) == len(SENSORS) * 7
+    for sensor in SENSORS:
+        rows = predictions[predictions["street"] == sensor["street"]]
+        city_weather = weather[weather["city"] == sensor["city"]].sort_values("date")
+        assert rows["days_before_forecast_day"].tolist() == list(range(7))
+        np.testing.assert_allclose(rows["predicted_pm25"], model.predict(city_weather.astype({f: np.float32 for f in WEATHER_FEATURES})), rtol=1e-6)
+    assert inference.predict_pm25_from_weather(model, weather.iloc[:0], SENSORS).empty
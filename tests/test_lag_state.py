@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import feature_engine
+from backend.lag_state import LagStateStore
+
+FEATURES = ["pm25_lag_1", "pm25_lag_3", "pm25_rolling_2d", "pm25_rolling_3d", "pm25_ewm_7d"]
+
+
+def _history(days=40, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=days)
+    return pd.concat(
+        [
+            pd.DataFrame({"country": "sweden", "city": "stockholm", "street": street, "date": dates, "pm25": rng.uniform(1, 50, days)})
+            for street in ("hammarby", "hornsgatan")
+        ],
+        ignore_index=True,
+    )
+
+
+def test_daily_features_match_the_backfill():
+    history = _history()
+    backfill = feature_engine.add_lag_features(history, feature_engine.feature_specs(FEATURES))
+
+    start = history["date"].min() + pd.Timedelta(days=10)
+    state = LagStateStore.from_history(history[history["date"] < start], FEATURES)
+    for date, day in history[history["date"] >= start].groupby("date"):
+        for row in day.itertuples(index=False):
+            key = (row.country, row.city, row.street)
+            expected = backfill[(backfill["street"] == row.street) & (backfill["date"] == date)].iloc[0]
+            features = state.features(key, FEATURES)
+            for feature in FEATURES:
+                assert features[feature] == pytest.approx(expected[feature], rel=1e-6), (feature, date)
+            state.update(key, row.pm25, row.date)
+
+
+def test_state_round_trips_through_json(tmp_path):
+    state = LagStateStore.from_history(_history(), FEATURES)
+    state.save(tmp_path / "lag_state.json")
+    loaded = LagStateStore.load(tmp_path / "lag_state.json")
+
+    key = ("sweden", "stockholm", "hammarby")
+    assert loaded.features(key, FEATURES) == state.features(key, FEATURES)
+    assert loaded.covers(FEATURES)
+    assert not loaded.covers(FEATURES + ["pm25_ewm_14d"])
+
+
+def test_seed_adds_new_sensors_and_replaces_stale_ones():
+    history = _history()
+    hornsgatan = history[history["street"] == "hornsgatan"]
+    state = LagStateStore.from_history(history[history["street"] == "hammarby"], FEATURES)
+    assert state.missing([("sweden", "stockholm", "hornsgatan")]) == [("sweden", "stockholm", "hornsgatan")]
+
+    # A backfill rewrote hammarby's history, the rebuilt sensor must not keep the old values
+    rewritten = history[history["street"] == "hammarby"].assign(pm25=lambda df: df["pm25"] * 2)
+    state.seed(pd.concat([rewritten, hornsgatan], ignore_index=True))
+
+    expected = LagStateStore.from_history(pd.concat([rewritten, hornsgatan], ignore_index=True), FEATURES)
+    assert state.missing([("sweden", "stockholm", "hornsgatan")]) == []
+    for street in ("hammarby", "hornsgatan"):
+        key = ("sweden", "stockholm", street)
+        assert state.features(key, FEATURES) == pytest.approx(expected.features(key, FEATURES))
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import local_store
+
+
+def _air_quality(seed=0, days=20):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=days)
+    return pd.concat(
+        [
+            pd.DataFrame({"country": "sweden", "city": city, "street": street, "date": dates, "pm25": rng.uniform(1, 50, days)})
+            for city, street in (("stockholm", "hammarby"), ("stockholm", "hornsgatan"), ("uppsala", "kungsgatan"))
+        ],
+        ignore_index=True,
+    )
+
+
+def _weather(seed=1):
+    rng = np.random.default_rng(seed)
+    # Every other day only, so the as-of join has to fall back to the day before
+    dates = pd.date_range("2024-12-30", periods=12, freq="2D")
+    return pd.concat(
+        [pd.DataFrame({"city": city, "date": dates, "temperature_2m_mean": rng.normal(5, 3, len(dates))}) for city in ("stockholm", "uppsala")],
+        ignore_index=True,
+    )
+
+
+def _groups(fs):
+    air_quality_fg = fs.get_or_create_feature_group("air_quality", 1, primary_key=["country", "city", "street"], event_time="date")
+    weather_fg = fs.get_or_create_feature_group("weather", 1, primary_key=["city"], event_time="date")
+    return air_quality_fg, weather_fg
+
+
+def _sorted(df, keys):
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("compact_after", [2, local_store.COMPACT_AFTER])
+def test_insert_upserts_on_primary_key_and_event_time(tmp_path, monkeypatch, compact_after):
+    monkeypatch.setattr(local_store, "COMPACT_AFTER", compact_after)
+    fg, _ = _groups(local_store.LocalProject(tmp_path).get_feature_store())
+    history = _air_quality()
+    keys = ["country", "city", "street", "date"]
+
+    fg.insert(history)
+    # Repaired values for the last days of one sensor, and a new day for it
+    repaired = history[(history["street"] == "hammarby") & (history["date"] >= "2025-01-15")].assign(pm25=-1.0)
+    new_day = repaired.tail(1).assign(date=pd.Timestamp("2025-01-21"), pm25=7.0)
+    fg.insert(repaired)
+    fg.insert(new_day)
+
+    expected = pd.concat([history, repaired, new_day], ignore_index=True).drop_duplicates(keys, keep="last")
+    pd.testing.assert_frame_equal(_sorted(fg.read(), keys), _sorted(expected, keys))
+
+    commits = list(fg.commit_details().values())
+    assert [(c["rowsInserted"], c["rowsUpdated"]) for c in commits] == [(1, 0), (0, len(repaired)), (len(history), 0)]
+
+
+def test_filters_match_pandas(tmp_path):
+    fg, _ = _groups(local_store.LocalProject(tmp_path).get_feature_store())
+    history = _air_quality()
+    fg.insert(history)
+
+    condition = (fg.date >= pd.Timestamp("2025-01-10")) & fg.street.isin(["hammarby", "kungsgatan"])
+    read = fg.filter(condition).read()
+    expected = history[(history["date"] >= "2025-01-10") & history["street"].isin(["hammarby", "kungsgatan"])]
+    pd.testing.assert_frame_equal(read, expected.reset_index(drop=True))
+
+
+def test_join_is_as_of_the_event_time(tmp_path):
+    air_quality_fg, weather_fg = _groups(local_store.LocalProject(tmp_path).get_feature_store())
+    history, weather = _air_quality(), _weather()
+    air_quality_fg.insert(history)
+    weather_fg.insert(weather)
+
+    joined = air_quality_fg.select(["pm25", "date"]).join(weather_fg.select_features(), on=["city"]).read(primary_key=True)
+    expected = pd.merge_asof(history.sort_values("date"), weather.sort_values("date"), on="date", by="city", direction="backward")
+
+    assert list(joined.columns[:3]) == ["pm25", "date", "temperature_2m_mean"]
+    joined = joined.rename(columns={air_quality_fg.key_column(c): c for c in air_quality_fg.primary_key})
+    keys = ["country", "city", "street", "date"]
+    pd.testing.assert_frame_equal(
+        _sorted(joined[keys + ["pm25", "temperature_2m_mean"]], keys),
+        _sorted(expected[keys + ["pm25", "temperature_2m_mean"]], keys),
+    )
+
+
+def test_versions_and_views_round_trip_through_disk(tmp_path):
+    fs = local_store.LocalProject(tmp_path).get_feature_store()
+    air_quality_fg, weather_fg = _groups(fs)
+    air_quality_fg.insert(_air_quality(seed=0))
+    weather_fg.insert(_weather())
+    v2 = fs.get_or_create_feature_group("air_quality", 2, primary_key=["country", "city", "street"], event_time="date")
+    v2.insert(_air_quality(seed=5))
+    query = air_quality_fg.select(["pm25", "date"]).join(weather_fg.select_features(), on=["city"])
+    view = fs.get_or_create_feature_view("air_quality_fv", 1, query=query, labels=["pm25"])
+    split = view.train_test_split(test_start=pd.Timestamp("2025-01-15"), primary_key=True)
+
+    # A new project over the same directory sees the same groups, versions and view
+    reopened = local_store.LocalProject(tmp_path).get_feature_store()
+    assert [fg.version for fg in reopened.get_feature_groups("air_quality")] == [1, 2]
+    pd.testing.assert_frame_equal(reopened.get_feature_group("air_quality", 1).read(), air_quality_fg.read())
+    pd.testing.assert_frame_equal(reopened.get_feature_group("air_quality", 2).read(), v2.read())
+    assert not reopened.get_feature_group("air_quality", 2).read().equals(air_quality_fg.read())
+
+    reopened_split = reopened.get_feature_view("air_quality_fv", 1).train_test_split(test_start=pd.Timestamp("2025-01-15"), primary_key=True)
+    for part, reopened_part in zip(split, reopened_split):
+        pd.testing.assert_frame_equal(part, reopened_part)
+    assert (split[0][air_quality_fg.key_column("street")].notna()).all()
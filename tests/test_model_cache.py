@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from backend import model_cache
+
+
+class FakeModel:
+    """Stands in for a registry model: download() writes the artifacts and counts the calls."""
+
+    def __init__(self, files):
+        self.files = files
+        self.downloads = 0
+
+    def download(self, local_path):
+        self.downloads += 1
+        for name, content in self.files.items():
+            with open(f"{local_path}/{name}", "w", encoding="utf-8") as fp:
+                fp.write(content)
+        return local_path
+
+
+def _no_fetch():
+    raise AssertionError("a cache hit must not ask the registry")
+
+
+@pytest.fixture(autouse=True)
+def _empty_lru():
+    model_cache.clear_loaded()
+    yield
+    model_cache.clear_loaded()
+
+
+def test_hit_needs_no_fetch(tmp_path):
+    fake = FakeModel({"model.json": "{}", "metrics.json": '{"rmse": 1}'})
+    first = model_cache.model_dir("aq", 1, lambda: fake, root=tmp_path)
+    assert fake.downloads == 1
+    assert model_cache.cache_problem("aq", 1, root=tmp_path) is None
+
+    assert model_cache.model_dir("aq", 1, _no_fetch, root=tmp_path) == first
+    assert (first / "metrics.json").read_text(encoding="utf-8") == '{"rmse": 1}'
+
+
+def test_corrupted_file_is_downloaded_again(tmp_path):
+    fake = FakeModel({"model.json": "{}"})
+    assert model_cache.cache_problem("aq", 1, root=tmp_path) == "not cached"
+    cached = model_cache.model_dir("aq", 1, lambda: fake, root=tmp_path)
+
+    (cached / "model.json").write_text("truncated", encoding="utf-8")
+    assert model_cache.cache_problem("aq", 1, root=tmp_path) == "files do not match their checksums"
+    cached = model_cache.model_dir("aq", 1, lambda: fake, root=tmp_path)
+    assert fake.downloads == 2
+    assert (cached / "model.json").read_text(encoding="utf-8") == "{}"
+
+
+def test_loaded_models_are_evicted_least_recently_used_first(tmp_path, monkeypatch):
+    xgb = pytest.importorskip("xgboost")
+
+    X = np.arange(20, dtype=np.float32).reshape(10, 2)
+    booster = xgb.train({"max_depth": 1}, xgb.DMatrix(X, label=X.sum(axis=1)), num_boost_round=2)
+    json_file = tmp_path / "booster.json"
+    booster.save_model(str(json_file))
+    fake = FakeModel({"model.json": json_file.read_text(encoding="utf-8")})
+    monkeypatch.setattr(model_cache, "LRU_SIZE", 2)
+
+    root = tmp_path / "cache"
+    first = model_cache.load_xgboost("a", 1, "model.json", lambda: fake, root=root)
+    model_cache.load_xgboost("b", 1, "model.json", lambda: fake, root=root)
+    # Using "a" again makes "b" the least recently used one
+    assert model_cache.load_xgboost("a", 1, "model.json", _no_fetch, root=root) is first
+    model_cache.load_xgboost("c", 1, "model.json", lambda: fake, root=root)
+
+    loaded = [key[1] for key in model_cache._loaded]
+    assert loaded == ["a", "c"]
+    # An evicted model is parsed again from the disk cache, without a download
+    assert model_cache.load_xgboost("b", 1, "model.json", _no_fetch, root=root) is not None
+    assert fake.downloads == 3
@@ -0,0 +1,55 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from backend import model_store
+
+xgb = pytest.importorskip("xgboost")
+
+NAMES = ["sweden_stockholm_hammarby", "sweden_stockholm_hornsgatan"]
+
+
+def _booster(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 10, (60, 3)).astype(np.float32)
+    y = X @ rng.uniform(0.2, 0.8, 3)
+    return xgb.train({"max_depth": 2}, xgb.DMatrix(X, label=y), num_boost_round=3), X
+
+
+def test_pack_round_trip_and_retrain_invalidates_it(tmp_path):
+    boosters = {}
+    for seed, name in enumerate(NAMES):
+        boosters[name], X = _booster(seed)
+        model_store.save_sensor_model(boosters[name], tmp_path, name, "json")
+
+    pack_path = model_store.pack_variant(tmp_path)
+    store = model_store.PackedModelStore(pack_path)
+    assert store.names() == NAMES
+    # Nothing is parsed until a sensor is asked for
+    assert len(store._loaded) == 0
+    for name in NAMES:
+        blob = store.raw(name)
+        assert hashlib.sha256(blob).hexdigest() == store.index[name]["sha256"]
+        np.testing.assert_allclose(store.load(name).predict(X), boosters[name].predict(xgb.DMatrix(X)), rtol=1e-6)
+    assert list(store._loaded) == NAMES
+
+    # A retrain in the other format replaces the JSON model and drops the pack that still holds the old one
+    retrained, _ = _booster(seed=7)
+    model_store.save_sensor_model(retrained, tmp_path, NAMES[0], "ubj")
+    assert not pack_path.exists()
+    assert not model_store.model_file(tmp_path, NAMES[0], "json").exists()
+    loaded = model_store.load_sensor_model(tmp_path, NAMES[0])
+    np.testing.assert_allclose(loaded.predict(X), retrained.predict(xgb.DMatrix(X)), rtol=1e-6)
+
+
+def test_corrupted_pack_entry_fails_its_checksum(tmp_path):
+    booster, _ = _booster(0)
+    model_store.save_sensor_model(booster, tmp_path, NAMES[0])
+    pack_path = model_store.pack_variant(tmp_path)
+
+    data = bytearray(pack_path.read_bytes())
+    data[-1] ^= 0xFF
+    pack_path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="checksum"):
+        model_store.PackedModelStore(pack_path).raw(NAMES[0])